@@ -0,0 +1,241 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, namedtuple
+
+
+# 采集到的一帧：帧序号、采集时间戳(time.monotonic)、图像和原始格式
+# pixel_format 为None时图像为BGR，否则为 HandRecognition.analyze_native 可直接处理的原始格式名（如 'YUYV'）
+CapturedFrame = namedtuple('CapturedFrame', ['frame_id', 'timestamp', 'frame', 'pixel_format'], defaults=(None,))
+
+
+class LatestFrameSlot:
+    """只保存最新一帧的槽位，新帧覆盖未被取走的旧帧（丢弃最旧）"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._latest = None
+        self._next_id = 0
+        self.dropped = 0
+
+    def put(self, frame, timestamp, pixel_format=None):
+        """写入新帧，返回分配的帧序号"""
+        with self._condition:
+            if self._latest is not None:
+                self.dropped += 1
+            self._next_id += 1
+            self._latest = CapturedFrame(self._next_id, timestamp, frame, pixel_format)
+            self._condition.notify_all()
+            return self._next_id
+
+    def get(self, timeout=0):
+        """取走最新帧；timeout为0时不阻塞，为None时一直等待，没有新帧时返回None"""
+        with self._condition:
+            if self._latest is None and timeout != 0:
+                self._condition.wait_for(lambda: self._latest is not None, timeout)
+            latest, self._latest = self._latest, None
+            return latest
+
+
+class BoundedFrameQueue:
+    """有界帧队列：写端只做 deque 追加（在SDK回调线程中调用，不持锁），队满时按策略丢帧
+
+    policy 为 'drop_oldest' 时新帧挤掉最旧的帧，为 'drop_newest' 时丢弃新到的帧。
+    假定只有一个写端和一个读端。
+    """
+
+    POLICIES = ('drop_oldest', 'drop_newest')
+
+    def __init__(self, maxsize=2, policy='drop_oldest'):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        # drop_oldest 交给 deque 的 maxlen 自动挤出
+        self._items = deque(maxlen=maxsize if policy == 'drop_oldest' else None)
+        self._ready = threading.Event()
+        self.pushed = 0
+        self.dropped = 0  # 写端因队满丢弃的项数
+        self.skipped = 0  # 读端 get_latest 跳过的旧项数
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """写入一项，返回是否入队（drop_newest 队满时为False）"""
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == 'drop_newest':
+                return False
+        self._items.append(item)
+        self.pushed += 1
+        self._ready.set()
+        return True
+
+    def get(self, timeout=0):
+        """取出最早的一项；timeout为0时不阻塞，为None时一直等待，超时返回None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._items.popleft()
+            except IndexError:
+                pass
+
+            if deadline is None:
+                remaining = None
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+            # 先清除再复查，避免错过清除前刚写入的一项
+            self._ready.clear()
+            if self._items:
+                continue
+            self._ready.wait(remaining)
+
+    def get_latest(self, timeout=0):
+        """取出最新的一项并丢弃更早的项（计入 skipped），等待方式同 get"""
+        item = self.get(timeout)
+        if item is None:
+            return None
+        # 逐个从队头取，取到的最后一项就是此刻最新的，期间写入的新项也会被取到
+        while True:
+            try:
+                newer = self._items.popleft()
+            except IndexError:
+                return item
+            self.skipped += 1
+            item = newer
+
+
+class CaptureThread:
+    """在独立线程中读取摄像头，写入最新帧槽位，识别端总能拿到最新一帧
+
+    camera 提供 read_native()（见 FrameSource）时按原始格式采集，否则用 read() 采集BGR图像。
+    """
+
+    def __init__(self, camera, slot=None):
+        self.camera = camera
+        self._read = getattr(camera, 'read_native', None) or (lambda: camera.read() + (None,))
+        self.slot = slot if slot is not None else LatestFrameSlot()
+        self.captured = 0
+        self.failures = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """启动采集线程"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='CaptureThread', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止采集线程并等待其退出，返回线程是否已退出
+
+        默认一直等待：读取本身有超时（如海康取流的 timeout_ms），线程总会退出。
+        给定 timeout 且超时时线程仍在读取，调用方不能释放底层设备，可稍后再次调用。
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def latest(self, timeout=0):
+        """获取最新帧，参见 LatestFrameSlot.get"""
+        return self.slot.get(timeout)
+
+    def stats(self):
+        """采集统计：已采集帧数、被覆盖丢弃的帧数和读取失败次数"""
+        return {
+            'captured': self.captured,
+            'dropped': self.slot.dropped,
+            'failures': self.failures,
+        }
+
+    def _run(self):
+        while self._running:
+            ret, frame, pixel_format = self._read()
+            timestamp = time.monotonic()
+            if not ret:
+                self.failures += 1
+                time.sleep(0.01)  # 避免摄像头断开时空转
+                continue
+
+            self.captured += 1
+            self.slot.put(frame, timestamp, pixel_format)
+
+
+class DecodingCaptureThread(CaptureThread):
+    """采集线程只取压缩码流（如MJPEG），解码交给线程池，与采集和识别并行
+
+    camera.read() 返回原始码流，decode 把码流解码为图像（失败时返回None）。
+    解码完成顺序可能与采集顺序不同，比已写入帧更旧的结果直接丢弃。
+    """
+
+    def __init__(self, camera, decode, workers=2, slot=None):
+        super().__init__(camera, slot)
+        self.decode = decode
+        self.workers = workers
+        self.late = 0  # 解码完成时已有更新帧而被丢弃的帧数
+        self._pool = None
+        self._in_flight = threading.Semaphore(workers)
+        self._order_lock = threading.Lock()
+        self._last_put = 0
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='FrameDecode')
+        super().start()
+
+    def stop(self, timeout=None):
+        if not super().stop(timeout):
+            return False
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        return True
+
+    def stats(self):
+        stats = super().stats()
+        stats['dropped'] += self.late
+        return stats
+
+    def _run(self):
+        while self._running:
+            # 解码线程全忙时先等待，码流不在内存中积压，由驱动只保留最新帧
+            if not self._in_flight.acquire(timeout=0.1):
+                continue
+
+            ret, raw = self.camera.read()
+            timestamp = time.monotonic()
+            if not ret:
+                self._in_flight.release()
+                self.failures += 1
+                time.sleep(0.01)  # 避免摄像头断开时空转
+                continue
+
+            self.captured += 1
+            self._pool.submit(self._decode, self.captured, timestamp, raw)
+
+    def _decode(self, seq, timestamp, raw):
+        try:
+            frame = self.decode(raw)
+            with self._order_lock:
+                if frame is None:
+                    self.failures += 1
+                elif seq < self._last_put:
+                    self.late += 1
+                else:
+                    self._last_put = seq
+                    self.slot.put(frame, timestamp)
+        finally:
+            self._in_flight.release()
@@ -0,0 +1,386 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from capture import CapturedFrame, CaptureThread, DecodingCaptureThread
+
+
+def synthetic_frames(width=640, height=480):
+    """合成帧：灰色背景上左右移动的肤色椭圆"""
+    background = np.full((height, width, 3), 90, dtype=np.uint8)
+
+    def generate(index):
+        frame = background.copy()
+        x = int((0.5 + 0.35 * np.sin(index / 15.0)) * width)
+        cv2.ellipse(frame, (x, height // 2), (width // 8, height // 4), 0, 0, 360, (120, 150, 200), -1)
+        return frame
+
+    return generate
+
+
+def file_frames(path, max_frames=300):
+    """由文件生成帧：视频文件、单张图片或图片目录，循环播放（最多预读 max_frames 帧）"""
+    if os.path.isdir(path):
+        frames = [frame for frame in (cv2.imread(name) for name in _image_files(path)[:max_frames])
+                  if frame is not None]
+    else:
+        frames = []
+        capture = cv2.VideoCapture(path)
+        while len(frames) < max_frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+        if not frames:
+            frame = cv2.imread(path)
+            frames = [frame] if frame is not None else []
+
+    if not frames:
+        raise ValueError(f"no frames could be read from {path}")
+    return lambda index: frames[index % len(frames)]
+
+
+def _image_files(path):
+    """目录下按文件名排序的图片"""
+    extensions = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+    return [name for name in sorted(glob.glob(os.path.join(path, '*'))) if name.lower().endswith(extensions)]
+
+
+class FrameSource:
+    """帧源接口
+
+    子类实现 open/read/release；read 与 cv2.VideoCapture.read 兼容，返回 (ret, BGR图像)。
+    能交出相机原始格式的子类另外实现 read_native，read_frame 和采集线程优先使用它。
+    read_frame 同步读取下一帧并附带时间戳，适合离线评测全速运行；
+    start 后由采集线程持续读取，latest 非阻塞地取最新一帧（旧帧被覆盖丢弃）。
+    """
+
+    def __init__(self):
+        self._capture = None
+        self._frames_read = 0
+
+    def open(self):
+        """打开帧源，返回自身"""
+        return self
+
+    def read(self):
+        raise NotImplementedError
+
+    def read_native(self):
+        """返回 (ret, 图像, 原始格式)，原始格式含义见 CapturedFrame.pixel_format；默认即 read() 的BGR图像"""
+        ret, frame = self.read()
+        return ret, frame, None
+
+    def release(self):
+        """释放底层设备或文件"""
+
+    def read_frame(self):
+        """同步读取下一帧，返回 CapturedFrame，读取失败或结束时返回None"""
+        ret, frame, pixel_format = self.read_native()
+        if not ret:
+            return None
+        self._frames_read += 1
+        return CapturedFrame(self._frames_read, time.monotonic(), frame, pixel_format)
+
+    def start(self):
+        """启动后台采集线程"""
+        if self._capture is None:
+            self._capture = self._make_capture()
+            self._capture.start()
+        return self
+
+    def latest(self, timeout=0):
+        """获取最新帧，参见 LatestFrameSlot.get"""
+        return self._capture.latest(timeout)
+
+    def stats(self):
+        """采集统计：已采集帧数、被覆盖丢弃的帧数和读取失败次数"""
+        if self._capture is None:
+            return {'captured': self._frames_read, 'dropped': 0, 'failures': 0}
+        return self._capture.stats()
+
+    def close(self):
+        """停止采集线程并释放帧源，等待线程退出后才释放，避免设备在读取过程中被关闭"""
+        if self._capture is not None:
+            self._capture.stop()
+            self._capture = None
+        self.release()
+
+    def _make_capture(self):
+        """创建后台采集线程，子类可替换为带解码流水线的实现"""
+        return CaptureThread(self)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _PacedSource(FrameSource):
+    """按 fps 限速出帧的帧源，fps为0时全速"""
+
+    def __init__(self, fps=0):
+        super().__init__()
+        self.fps = fps
+        self._next_due = None
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_due is not None and self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due = max(now, self._next_due or now) + 1.0 / self.fps
+
+
+class WebcamSource(FrameSource):
+    """本地摄像头（Linux 上为 V4L2 设备）
+
+    打开时显式协商 FOURCC、分辨率和帧率，并把驱动缓存设为 buffer_size 帧以减少排队延迟；
+    参数为None时保持驱动默认值。协商结果为 MJPEG 且 decode_workers>0 时，
+    后台采集只取原始码流，JPEG 解码在线程池中与采集和识别并行。
+    """
+
+    def __init__(self, index=0, fourcc='MJPG', width=640, height=480, fps=30, buffer_size=1, decode_workers=2):
+        super().__init__()
+        self.index = index
+        self.fourcc = fourcc
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.decode_workers = decode_workers
+        self.negotiated = {}  # 驱动实际采用的参数
+        self.raw_mjpeg = False
+        self.camera = None
+
+    def open(self):
+        # Linux 上直接使用 V4L2 后端，属性设置才能下发到驱动
+        api = cv2.CAP_V4L2 if sys.platform.startswith('linux') else cv2.CAP_ANY
+        self.camera = cv2.VideoCapture(self.index, api)
+        if not self.camera.isOpened():
+            print(f"Error opening webcam {self.index}")
+            return self
+
+        # FOURCC 须在分辨率之前设置，否则驱动可能按旧格式选择分辨率
+        if self.fourcc:
+            self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width:
+            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self.camera.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size and not self.camera.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size):
+            print("Error setting webcam buffer size: not supported by this backend")
+
+        fourcc = int(self.camera.get(cv2.CAP_PROP_FOURCC))
+        self.negotiated = {
+            'fourcc': ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)),
+            'width': int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.camera.get(cv2.CAP_PROP_FPS),
+        }
+
+        # 关闭后端自带的格式转换后，read 返回未解码的 JPEG 码流
+        self.raw_mjpeg = (self.decode_workers > 0 and self.negotiated['fourcc'] == 'MJPG' and
+                          self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+        return self
+
+    def read(self):
+        ret, frame = self.camera.read()
+        if ret and self.raw_mjpeg:
+            frame = self._decode(frame)
+            ret = frame is not None
+        return ret, frame
+
+    def _make_capture(self):
+        if self.raw_mjpeg:
+            return DecodingCaptureThread(self.camera, self._decode, self.decode_workers)
+        return super()._make_capture()
+
+    @staticmethod
+    def _decode(raw):
+        return cv2.imdecode(raw, cv2.IMREAD_COLOR)
+
+    def release(self):
+        if self.camera is not None:
+            self.camera.release()
+            self.camera = None
+
+
+class HikSource(FrameSource):
+    """海康相机，callback=True 时由SDK回调直接写入有界队列，无需采集线程
+
+    native=True 时按 hik_camera.NATIVE_FORMAT_PREFERENCE 协商YUV422或Bayer格式，链路带宽更小；
+    latest()/read_frame() 交出原始图像（CapturedFrame.pixel_format 为格式名），由识别端直接交给
+    HandRecognition.analyze_native，不在主机上先转换为BGR。read() 仍返回BGR图像。
+    """
+
+    def __init__(self, device_index=0, callback=False, pixel_formats=(), native=False):
+        super().__init__()
+        self.device_index = device_index
+        self.callback = callback
+        self.pixel_formats = pixel_formats
+        self.native = native
+        self.camera = None
+
+    def open(self):
+        import hik_camera
+
+        pixel_formats = self.pixel_formats
+        if self.native and not pixel_formats:
+            pixel_formats = hik_camera.NATIVE_FORMAT_PREFERENCE
+        if self.callback:
+            # 原始格式只能通过 RegisterImageCallBackEx 拿到
+            self.camera = hik_camera.HikCallbackSource(self.device_index, bgr=not self.native,
+                                                       pixel_formats=pixel_formats, native=self.native)
+        else:
+            self.camera = hik_camera.HikFrameSource(self.device_index, pixel_formats=pixel_formats)
+        self.camera.open()
+        return self
+
+    def read(self):
+        return self.camera.read()
+
+    def read_native(self):
+        if self.native:
+            return self.camera.read_native()
+        return super().read_native()
+
+    def start(self):
+        if self.callback:
+            return self
+        return super().start()
+
+    def latest(self, timeout=0):
+        if self.callback:
+            return self.camera.latest(timeout)
+        return super().latest(timeout)
+
+    def stats(self):
+        if self.callback:
+            return self.camera.stats()
+        return super().stats()
+
+    def release(self):
+        if self.camera is not None:
+            self.camera.close()
+            self.camera = None
+
+
+class VideoFileSource(_PacedSource):
+    """视频文件；fps为0时全速读取，loop为True时播放结束后从头开始"""
+
+    def __init__(self, path, fps=0, loop=False):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.video = None
+
+    def open(self):
+        self.video = cv2.VideoCapture(self.path)
+        if not self.video.isOpened():
+            raise ValueError(f"cannot open video file {self.path}")
+        return self
+
+    def read(self):
+        self._pace()
+        ret, frame = self.video.read()
+        if not ret and self.loop:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.video.read()
+        return ret, frame
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+
+class ImageDirSource(_PacedSource):
+    """按文件名顺序读取目录中的图片"""
+
+    def __init__(self, path, fps=0, loop=False):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.files = []
+        self._position = 0
+
+    def open(self):
+        self.files = _image_files(self.path)
+        if not self.files:
+            raise ValueError(f"no images found in {self.path}")
+        self._position = 0
+        return self
+
+    def read(self):
+        self._pace()
+        if self._position >= len(self.files):
+            if not self.loop:
+                return False, None
+            self._position = 0
+        frame = cv2.imread(self.files[self._position])
+        self._position += 1
+        return frame is not None, frame
+
+
+class SyntheticSource(_PacedSource):
+    """合成帧，frames 为 index -> BGR图像 的函数，默认见 synthetic_frames"""
+
+    def __init__(self, width=640, height=480, fps=0, frames=None):
+        super().__init__(fps)
+        self.frames = frames if frames is not None else synthetic_frames(width, height)
+        self._index = 0
+
+    def read(self):
+        self._pace()
+        frame = self.frames(self._index)
+        self._index += 1
+        return True, frame
+
+
+def create_source(spec, fps=0):
+    """按描述字符串创建帧源（未打开）
+
+    webcam[:索引]、hik[:索引]、hik-callback[:索引]、hik-native[:索引]、hik-native-callback[:索引]、
+    hik-mock[:索引]、video:路径、images:目录、synthetic[:宽x高]；也可直接给出摄像头索引、视频文件或图片目录路径。
+    hik-native 系列协商相机原始格式（YUV422/Bayer），帧以原始格式交给识别端。
+    fps 只对视频、图片和合成帧源生效，为0时全速。
+    """
+    kind, _, arg = spec.partition(':')
+    if kind not in ('webcam', 'hik', 'hik-callback', 'hik-native', 'hik-native-callback', 'hik-mock',
+                    'video', 'images', 'synthetic'):
+        # 未写类型时按内容推断
+        if spec.isdigit():
+            kind, arg = 'webcam', spec
+        elif os.path.isdir(spec):
+            kind, arg = 'images', spec
+        elif os.path.isfile(spec):
+            kind, arg = 'video', spec
+        else:
+            raise ValueError(f"unknown frame source {spec!r}")
+
+    if kind == 'webcam':
+        return WebcamSource(int(arg or 0))
+    if kind in ('hik', 'hik-callback', 'hik-native', 'hik-native-callback'):
+        return HikSource(int(arg or 0), callback=kind.endswith('-callback'), native=kind.startswith('hik-native'))
+    if kind == 'hik-mock':
+        import hik_mock
+        hik_mock.install()
+        return HikSource(int(arg or 0))
+    if kind == 'video':
+        return VideoFileSource(arg, fps)
+    if kind == 'images':
+        return ImageDirSource(arg, fps)
+    if arg:
+        width, height = (int(v) for v in arg.lower().split('x'))
+        return SyntheticSource(width, height, fps)
+    return SyntheticSource(fps=fps)
@@ -0,0 +1,120 @@
+import queue
+import threading
+from collections import namedtuple
+
+from frame_sources import create_source
+from hand_recognition import HandRecognition
+
+
+# 一帧的识别事件：帧序号、采集时间戳（time.monotonic）、手势（未检测到手部时为None）、凸缺陷数、手部外接框
+GestureEvent = namedtuple('GestureEvent', ['frame_id', 'timestamp', 'gesture', 'defect_count', 'bbox'])
+
+# 流水线各级之间传递的流结束标记和异常
+_END = object()
+_Failure = namedtuple('_Failure', ['error'])
+
+
+class _Stage:
+    """在后台线程中运行的一级流水线：逐个取出 produce() 生成的结果写入有界队列，队列满时阻塞等待下游"""
+
+    def __init__(self, name, produce, prefetch, stop):
+        self.queue = queue.Queue(maxsize=prefetch)
+        self._produce = produce
+        self._stop = stop
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def join(self):
+        self._thread.join()
+
+    def items(self):
+        """按顺序取出本级结果直到流结束，本级出错时在调用线程中重新抛出"""
+        while not self._stop.is_set():
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _run(self):
+        try:
+            for item in self._produce():
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._put(_Failure(e))
+            return
+        self._put(_END)
+
+    def _put(self, item):
+        """写入队列，下游已停止时放弃并返回False"""
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def iter_gestures(source, hand_recognition=None, prefetch=2, fps=0):
+    """逐帧识别帧源中的手势，按帧顺序产出 GestureEvent
+
+    读取（含解码）、肤色分割和特征提取分类三级流水执行：前两级各在一个后台线程中，
+    最后一级在调用方线程中；级间队列最多缓存 prefetch 项，下游跟不上时上游阻塞，内存占用与流长度无关。
+    source 为已打开的 FrameSource（不要调用 start，由本函数同步读取），或 create_source 的描述字符串
+    （由本函数打开并在结束时关闭，fps 同 create_source）。原始格式的帧（如 hik-native）直接在原始格式上分割。
+    提前结束迭代时后台线程随之停止。
+    """
+    owns_source = isinstance(source, str)
+    if owns_source:
+        source = create_source(source, fps=fps).open()
+    if hand_recognition is None:
+        hand_recognition = HandRecognition()
+
+    stop = threading.Event()
+
+    def read():
+        while True:
+            captured = source.read_frame()
+            if captured is None:
+                return
+            yield captured
+
+    def segment():
+        # 只向下游传递帧序号和时间戳，图像在本级用完即释放
+        for captured in reader.items():
+            if captured.pixel_format is None:
+                reused, hand = hand_recognition.segment(captured.frame)
+            else:
+                reused, hand = hand_recognition.segment_native(captured.frame, captured.pixel_format)
+            yield captured.frame_id, captured.timestamp, reused, hand
+
+    reader = _Stage('GestureStreamRead', read, prefetch, stop)
+    segmenter = _Stage('GestureStreamSegment', segment, prefetch, stop)
+    try:
+        reader.start()
+        segmenter.start()
+
+        features, gesture = None, None
+        for frame_id, timestamp, reused, hand in segmenter.items():
+            # 场景静止的帧沿用上一帧的结果
+            if not reused:
+                features, gesture = hand_recognition.classify(hand)
+            if features is None:
+                yield GestureEvent(frame_id, timestamp, None, 0, None)
+            else:
+                yield GestureEvent(frame_id, timestamp, gesture, features.defect_count, features.bbox)
+    finally:
+        stop.set()
+        reader.join()
+        segmenter.join()
+        if owns_source:
+            source.close()
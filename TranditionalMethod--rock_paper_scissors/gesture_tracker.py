@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+
+# 跟踪结果：稳定手势、置信度、本帧是否刚刚确认、窗口内平均凸缺陷数
+GestureState = namedtuple('GestureState', ['label', 'confidence', 'committed', 'mean_defects'])
+
+
+class GestureTracker:
+    """在最近若干帧的识别结果上做时间平滑
+
+    环形缓冲保存最近 window 帧的手势和凸缺陷数，同时维护各手势的计数，每帧更新为 O(1)。
+    稳定手势只有在新手势的票数超过当前手势 hysteresis 票时才切换；
+    稳定手势占满窗口的比例达到 commit_ratio 时确认一次（committed 只在该帧为True）。
+    """
+
+    def __init__(self, window=10, commit_ratio=0.8, hysteresis=2, commit_labels=('rock', 'paper', 'scissors')):
+        self.window = window
+        self.commit_ratio = commit_ratio
+        self.hysteresis = hysteresis
+        self.commit_labels = commit_labels
+        self.reset()
+
+    def reset(self):
+        """清空历史，开始新回合"""
+        self._labels = [None] * self.window
+        self._defects = [0] * self.window
+        self._position = 0
+        self._counts = {}
+        self._defect_sum = 0
+        self.label = None
+        self.committed = False
+
+    def update(self, gesture, defect_count=0):
+        """加入一帧的识别结果（未检测到手部时 gesture 为None），返回 GestureState"""
+        # 覆盖最旧的一帧
+        position = self._position
+        evicted = self._labels[position]
+        if evicted is not None:
+            self._counts[evicted] -= 1
+        self._defect_sum -= self._defects[position]
+
+        self._labels[position] = gesture
+        self._defects[position] = defect_count
+        self._defect_sum += defect_count
+        if gesture is not None:
+            self._counts[gesture] = self._counts.get(gesture, 0) + 1
+        self._position = (position + 1) % self.window
+
+        # 滞回切换：只有新手势明显多于当前稳定手势时才切换
+        current = self._counts.get(self.label, 0) if self.label is not None else 0
+        if gesture is not None and gesture != self.label and self._counts[gesture] >= current + self.hysteresis:
+            self.label = gesture
+            current = self._counts[gesture]
+        elif self.label is not None and current == 0:
+            self.label = None
+
+        confidence = current / self.window
+        just_committed = (not self.committed and self.label in self.commit_labels and
+                          confidence >= self.commit_ratio)
+        if just_committed:
+            self.committed = True
+
+        return GestureState(self.label, confidence, just_committed, self._defect_sum / self.window)
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+# 按列存储的特征表的字段，detected 为False的行表示该帧未检测到手部
+FEATURE_DTYPE = np.dtype([
+    ('detected', np.bool_),
+    ('area', np.float32),
+    ('hull_area', np.float32),
+    ('solidity', np.float32),
+    ('extent', np.float32),
+    ('bbox', np.int32, (4,)),
+    ('center', np.int32, (2,)),
+    ('defect_count', np.int32),
+])
+
+
+# 没有凸缺陷的记录共享的空数组
+_NO_DEFECTS = np.empty((0, 3, 2), dtype=np.int32)
+_NO_DEFECTS.flags.writeable = False
+
+
+class HandFeatures:
+    """一帧手部特征的定长记录
+
+    defects 为 int32 数组，形状 (defect_count, 3, 2)，每行依次为凸缺陷的起点、终点和最远点；
+    只在存在有效凸缺陷时按实际数量分配一次，否则为共享的只读空数组。contour 和 hull 为原始点集，只用于绘制。
+    """
+
+    __slots__ = ('contour', 'hull', 'area', 'hull_area', 'solidity', 'extent', 'bbox', 'center',
+                 'defect_count', 'defects')
+
+    def __init__(self, contour=None, hull=None, area=0.0, hull_area=0.0, bbox=(0, 0, 0, 0)):
+        self.contour = contour
+        self.hull = hull
+        self.area = area
+        self.hull_area = hull_area
+        self.solidity = area / hull_area if hull_area > 0 else 0
+        self.extent = area / (bbox[2] * bbox[3]) if bbox[2] and bbox[3] else 0
+        self.bbox = bbox
+        self.center = (bbox[0] + bbox[2] // 2, bbox[1] + bbox[3] // 2)
+        self.defect_count = 0
+        self.defects = _NO_DEFECTS
+
+    def set_defects(self, starts, ends, fars):
+        """写入有效凸缺陷的起点、终点和最远点（各为 N×2 数组）"""
+        count = len(fars)
+        self.defect_count = count
+        if not count:
+            self.defects = _NO_DEFECTS
+            return
+        self.defects = np.empty((count, 3, 2), dtype=np.int32)
+        self.defects[:, 0] = starts
+        self.defects[:, 1] = ends
+        self.defects[:, 2] = fars
+
+    def defect_points(self):
+        """有效凸缺陷的最远点，形状 (defect_count, 2)"""
+        return self.defects[:, 2]
+
+    def as_row(self):
+        """标量特征，按 FEATURE_DTYPE 的字段顺序"""
+        return (True, self.area, self.hull_area, self.solidity, self.extent, self.bbox, self.center,
+                self.defect_count)
+
+
+def feature_table(records, out=None):
+    """把特征记录（可含None）批量写成按列存储的结构化数组，out 为可复用的输出数组"""
+    records = list(records)
+    if out is None or len(out) < len(records):
+        out = np.zeros(len(records), dtype=FEATURE_DTYPE)
+    else:
+        out = out[:len(records)]
+        out[:] = np.zeros((), dtype=FEATURE_DTYPE)
+    for i, record in enumerate(records):
+        if record is not None:
+            out[i] = record.as_row()
+    return out
+
+
+class FeatureTableBuilder:
+    """逐帧追加行的特征表，容量不足时倍增，适合长度未知的帧序列"""
+
+    def __init__(self, capacity=0):
+        self._rows = np.zeros(max(capacity, 16), dtype=FEATURE_DTYPE)
+        self._count = 0
+
+    def append(self, row=None):
+        """追加一行（as_row 格式的元组），row 为None时表示该帧未检测到手部"""
+        if self._count == len(self._rows):
+            rows = np.zeros(2 * len(self._rows), dtype=FEATURE_DTYPE)
+            rows[:self._count] = self._rows
+            self._rows = rows
+        if row is not None:
+            self._rows[self._count] = row
+        self._count += 1
+
+    def table(self):
+        """已追加的各行"""
+        return self._rows[:self._count]
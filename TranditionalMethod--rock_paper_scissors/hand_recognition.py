@@ -1,8 +1,141 @@
+import copy
+import itertools
+
 import cv2
 import numpy as np
 
+import overlay
+from hand_features import FeatureTableBuilder, HandFeatures
+from skin_model import SkinClassifier, SkinLUT, native_to_planar
+
+
+class _ScratchArena:
+    """预处理用的复用缓冲区，只有在帧尺寸超过已分配容量时才重新分配"""
+
+    def __init__(self):
+        self.capacity = (0, 0)
+
+    def views(self, shape):
+        """返回左上角与帧尺寸一致的各缓冲区视图"""
+        height, width = shape[:2]
+        if height > self.capacity[0] or width > self.capacity[1]:
+            self._allocate(max(height, self.capacity[0]), max(width, self.capacity[1]))
+
+        return (self.blurred[:height, :width], self.filtered[:height, :width],
+                self.quantized[:height, :width], self.index[:height, :width],
+                self.mask[:height, :width], self.mask_tmp[:height, :width])
+
+    def _allocate(self, height, width):
+        self.capacity = (height, width)
+        self.blurred = np.empty((height, width, 3), dtype=np.uint8)
+        self.filtered = np.empty((height, width, 3), dtype=np.uint8)
+        self.quantized = np.empty((height, width, 3), dtype=np.uint8)
+        self.index = np.empty((height, width), dtype=np.uint32)
+        self.mask = np.empty((height, width), dtype=np.uint8)
+        self.mask_tmp = np.empty((height, width), dtype=np.uint8)
+
+
+class _IncrementalMask:
+    """在整帧坐标的全局图块网格上增量维护掩码
+
+    保存上次的输入和掩码（均为整帧尺寸），掩码按完整上下文计算，即等于整帧计算结果在该处的值。
+    每次只比较窗口及其影响半径内的输入：变化的像素使 halo 范围内的掩码图块失效，
+    窗口内失效的图块按连通区域带 halo 重新计算。窗口随手移动时，背景未变的图块直接复用。
+    只在输入无噪声时有收益：有传感器噪声时每个图块都有像素变化，每帧都要整窗重算，另加比较和复制的开销。
+    """
+
+    def __init__(self):
+        self.key = None
+        self.previous = None  # 上次的输入，只在 stored 图块内有意义
+        self.mask = None  # 掩码，只在 valid 图块内有意义
+        self.stored = None  # 图块网格：previous 中已保存输入的图块
+        self.valid = None  # 图块网格：掩码与 previous 中的输入一致的图块
+
+    def update(self, frame, window, key, compute, tile, halo, max_dirty_ratio):
+        """返回 frame 在 window=(x0, y0, x1, y1) 内的掩码
+
+        compute(区域图像) 计算任意区域的掩码，halo 为输出像素依赖的输入半径。
+        """
+        if self.key != key or self.previous is None or self.previous.shape != frame.shape:
+            self._reset(frame, key, tile)
+
+        height, width = frame.shape[:2]
+        rows, cols = self.valid.shape
+        grow = -(-halo // tile)  # 覆盖 halo 的图块数
+        x0, y0, x1, y1 = window
+
+        # 窗口覆盖的图块范围，以及会影响这些图块的输入所在的图块范围
+        tx0, ty0, tx1, ty1 = x0 // tile, y0 // tile, -(-x1 // tile), -(-y1 // tile)
+        ex0, ey0 = max(0, tx0 - grow), max(0, ty0 - grow)
+        ex1, ey1 = min(cols, tx1 + grow), min(rows, ty1 + grow)
+
+        # 已保存且发生变化的输入使 halo 范围内的掩码图块失效，之后该范围内的输入即可覆盖保存
+        px0, py0, px1, py1 = ex0 * tile, ey0 * tile, min(width, ex1 * tile), min(height, ey1 * tile)
+        region = frame[py0:py1, px0:px1]
+        changed = self._changed_tiles(region, self.previous[py0:py1, px0:px1], tile)
+        changed &= self.stored[ey0:ey1, ex0:ex1]
+        if changed.any():
+            dirty = np.zeros((rows, cols), dtype=np.uint8)
+            dirty[ey0:ey1, ex0:ex1] = changed
+            dirty = cv2.dilate(dirty, np.ones((2 * grow + 1, 2 * grow + 1), dtype=np.uint8))
+            self.valid[dirty > 0] = False
+        self.previous[py0:py1, px0:px1] = region
+        self.stored[ey0:ey1, ex0:ex1] = True
+
+        needed = np.logical_not(self.valid[ty0:ty1, tx0:tx1]).view(np.uint8)
+        count = cv2.countNonZero(needed)
+        if count > max_dirty_ratio * needed.size:
+            self._compute(frame, (tx0, ty0, tx1, ty1), compute, tile, halo)
+        elif count:
+            _, _, stats, _ = cv2.connectedComponentsWithStats(needed, connectivity=8)
+            for cx, cy, cw, ch, _ in stats[1:]:
+                self._compute(frame, (tx0 + cx, ty0 + cy, tx0 + cx + cw, ty0 + cy + ch), compute, tile, halo)
+
+        return self.mask[y0:y1, x0:x1]
+
+    def _reset(self, frame, key, tile):
+        height, width = frame.shape[:2]
+        grid = (-(-height // tile), -(-width // tile))
+        self.key = key
+        self.previous = np.empty_like(frame)
+        self.mask = np.empty((height, width), dtype=np.uint8)
+        self.stored = np.zeros(grid, dtype=bool)
+        self.valid = np.zeros(grid, dtype=bool)
+
+    def _compute(self, frame, tiles, compute, tile, halo):
+        """在向外扩展 halo 的区域上计算一组图块，只取回图块内的结果"""
+        height, width = frame.shape[:2]
+        tx0, ty0, tx1, ty1 = tiles
+        x0, y0, x1, y1 = tx0 * tile, ty0 * tile, min(width, tx1 * tile), min(height, ty1 * tile)
+        ex0, ey0 = max(0, x0 - halo), max(0, y0 - halo)
+        ex1, ey1 = min(width, x1 + halo), min(height, y1 + halo)
+        region_mask = compute(frame[ey0:ey1, ex0:ex1])
+        self.mask[y0:y1, x0:x1] = region_mask[y0 - ey0:y1 - ey0, x0 - ex0:x1 - ex0]
+        self.valid[ty0:ty1, tx0:tx1] = True
+
+    @staticmethod
+    def _changed_tiles(frame, previous, tile):
+        """逐图块判断输入是否有任何像素变化，返回布尔图块网格（frame 左上角须与图块对齐）"""
+        height, width = frame.shape[:2]
+        rows, cols = -(-height // tile), -(-width // tile)
+        diff = cv2.absdiff(frame, previous)
+        if height % tile or width % tile:
+            # 贴着图像边缘的不完整图块补零，使各维都能按图块整除
+            padded = np.zeros((rows * tile, cols * tile) + diff.shape[2:], dtype=diff.dtype)
+            padded[:height, :width] = diff
+            diff = padded
+        diff = diff.reshape(rows, tile, -1).max(axis=1)
+        return diff.reshape(rows, cols, -1).max(axis=2) > 0
+
 
 class HandRecognition:
+    # 掩码上每个像素依赖的输入半径：高斯3x3(1) + 双边d=5(2) + 闭运算5x5两次(8) + 开运算5x5(4) + 中值5x5(2)
+    MASK_HALO = 17
+
+    # 决定识别结果的参数，settings()/apply_settings() 按此复制
+    SETTINGS = ('skin_ranges', 'gesture_params', 'skin_lut_bits', 'yuv_lut_bits', 'tracking_params',
+                'pyramid_params', 'motion_params', 'incremental_params', 'render_policy')
+
     def __init__(self):
         # 优化肤色范围，使用更严格的阈值
         self.skin_ranges = [
@@ -20,143 +153,451 @@ class HandRecognition:
         # 简化的手势参数
         self.gesture_params = {
             'min_area': 7000,  # 最小手部面积
+            'min_contour_area': 5000,  # 候选轮廓的最小面积，更小的轮廓视为噪声
             'min_solidity': 0.7,  # 最小紧凑度
             'defect_angle_range': (30, 85),  # 有效凸缺陷的角度范围
             'min_defect_depth': 12000,  # 最小凸缺陷深度
         }
 
-    def detect_gestures(self, frame):
-        """检测手势"""
-        # 1. 多尺度图像预处理
-        processed_mask = self._preprocess_image(frame)
-
-        # 2. 轮廓检测和筛选
-        contours, _ = cv2.findContours(processed_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        gestures = []
-
-        if contours:
-            # 筛选有效轮廓
-            valid_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > 5000]
-            if valid_contours:
-                max_contour = max(valid_contours, key=cv2.contourArea)
+        # 肤色分类：skin_lut_bits 为None时BGR输入逐颜色空间精确计算；设为1-8时改用量化查找表（8位与精确计算一致）
+        # 原始格式展开的YUV输入只能查表，量化位数为 yuv_lut_bits
+        self.skin_lut_bits = None
+        self.yuv_lut_bits = 6
+        self._skin_luts = {}  # 输入颜色空间 -> 分类器
+        self._native_buffer = None  # 原始格式展开后的三通道图像
+
+        # 跟踪模式参数：找到手后只处理上一帧手部周围的窗口
+        self.tracking_params = {
+            'enabled': True,
+            'padding': 0.5,  # 窗口相对手部外接框每边扩展的比例
+            'reacquire_interval': 15,  # 每隔多少帧强制全帧重新检测
+        }
+        self._track_bbox = None  # 上一帧手部外接框 (x, y, w, h)
+        self._track_shape = None  # 跟踪时的帧尺寸，分辨率变化时重新全帧检测
+        self._frames_since_full = 0
+
+        # 金字塔模式参数：全帧检测时先在低分辨率上分割，再在全分辨率手部区域上细化
+        self.pyramid_params = {
+            'enabled': True,
+            'max_width': 640,  # 低分辨率层的最大宽度，不超过该宽度的输入不缩放
+            'refine_padding': 0.15,  # 全分辨率细化窗口的扩展比例
+        }
 
-                # 3. 特征提取和手势识别
-                features = self._extract_enhanced_features(max_contour)
-                gesture = self._recognize_gesture_enhanced(features)
-                gestures.append(gesture)
+        # 运动门控参数：场景相对上次完整计算没有变化时复用上次结果
+        self.motion_params = {
+            'enabled': True,
+            'thumb_size': (64, 48),  # 比较用缩略图尺寸
+            'threshold': 8,  # 缩略图任一像素的最大灰度变化，不超过时视为静止
+            'max_reuse': 10,  # 最多连续复用的帧数，之后强制重新计算
+        }
+        self._motion_thumb = None  # 上次完整计算时的缩略图
+        self._motion_reused = 0
+        self._last_analysis = None  # 上次完整计算的 (特征, 手势, 掩码)
+
+        # 预处理用的结构元素和缓冲区，避免每帧重新分配
+        # 返回的掩码是缓冲区视图，在同一层级下一次预处理前有效
+        self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self._arenas = {'frame': _ScratchArena(), 'pyramid': _ScratchArena()}
+
+        # 增量掩码参数：同一层级帧尺寸不变时只重新计算窗口内输入发生变化的图块
+        # 任一像素变化即视为图块变化，只对无噪声的输入（合成或解码后的静态画面）有效；
+        # 真实相机的传感器噪声会使所有图块失效，比较和复制反而增加开销，因此默认关闭
+        self.incremental_params = {
+            'enabled': False,
+            'tile': 32,  # 图块边长
+            'max_dirty_ratio': 0.5,  # 窗口内需要重算的图块超过该比例时整个窗口一次计算
+        }
+        self._incremental = {'frame': _IncrementalMask(), 'pyramid': _IncrementalMask()}
 
-                # 4. 可视化
-                self._draw_enhanced_feedback(frame, features, gesture, processed_mask)
+        # 可视化策略：'off' 不生成叠加层，'minimal' 只标出手部外接框和手势，'full' 为完整调试信息
+        self.render_policy = 'full'
 
+    def detect_gestures(self, frame):
+        """检测手势，返回 (frame, 手势列表)
+
+        不修改输入帧，返回的 frame 即输入帧；需要可视化时用 build_overlay 生成叠加层，
+        由显示端用 overlay.render 绘制。
+        """
+        # 1-3. 预处理、轮廓筛选、特征提取和手势识别（场景静止时复用上次结果）
+        features, gesture, _ = self._analyze(frame)
+        gestures = [gesture] if features is not None else []
         return frame, gestures
 
-    def _preprocess_image(self, frame):
-        """增强的图像预处理"""
-        # 降噪和平滑
-        frame = cv2.GaussianBlur(frame, (3, 3), 0)
-        frame = cv2.bilateralFilter(frame, 5, 75, 75)  # 添加双边滤波
-
-        # 创建掩码
-        final_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+    def analyze_frame(self, frame, color_space='BGR'):
+        """只识别不绘制，返回 (手势, 特征)，未检测到手部时返回 (None, None)"""
+        features, gesture, _ = self._analyze(frame, color_space)
+        return gesture, features
+
+    def analyze_native(self, image, pixel_format):
+        """直接识别相机原始格式（'YUYV'、'UYVY' 或 'BayerRG' 等）的图像，返回值同 analyze_frame
+
+        YUV422 输入在 YUV 空间内完成分割，不生成BGR中间图像。
+        """
+        return self.analyze_frame(*self._planar(image, pixel_format))
+
+    def _planar(self, image, pixel_format):
+        """把原始格式展开到复用的缓冲区中，返回 (图像, 颜色空间)，结果在下一次展开前有效"""
+        height, width = image.shape[:2]
+        if self._native_buffer is None or self._native_buffer.shape[:2] != (height, width):
+            self._native_buffer = np.empty((height, width, 3), dtype=np.uint8)
+        return native_to_planar(image, pixel_format, dst=self._native_buffer)
+
+    def detect_gestures_batch(self, frames, workers=0):
+        """批量识别BGR帧序列（N×H×W×3 数组或任意可迭代对象），返回 (手势列表, 特征表)
+
+        特征表为 hand_features.FEATURE_DTYPE 结构化数组，与手势列表逐帧对应，未检测到手部或识别出错的帧手势为None。
+        不生成叠加层。每帧独立识别（不使用跟踪和运动门控），结果与帧的顺序和 workers 无关；
+        识别在按本实例参数新建的实例上进行，不影响本实例的状态，可与识别线程共用同一实例。
+        workers>0 时由 ProcessPoolRecognizer 按本实例的参数多进程识别（各帧尺寸须相同），结果仍按输入顺序排列。
+        """
+        gestures = []
+        table = FeatureTableBuilder(len(frames) if hasattr(frames, '__len__') else 0)
+
+        if workers:
+            from parallel_recognition import ProcessPoolRecognizer, result_row
+
+            frames = iter(frames)
+            first = next(frames, None)
+            if first is None:
+                return gestures, table.table()
+            with ProcessPoolRecognizer(first.shape, workers, settings=self.settings()) as pool:
+                for result in pool.imap(itertools.chain([first], frames)):
+                    if result.error is not None:
+                        print(f"Error in batch recognition of frame {result.seq}: {result.error}")
+                    gestures.append(result.gesture)
+                    table.append(result_row(result))
+            return gestures, table.table()
+
+        # 在按本实例参数新建的私有实例上识别，不触碰本实例的跟踪和运动门控状态（可能正被识别线程使用）
+        hand_recognition = HandRecognition()
+        hand_recognition.apply_settings(self.settings())
+        hand_recognition.tracking_params['enabled'] = False
+        hand_recognition.motion_params['enabled'] = False
+        for seq, frame in enumerate(frames):
+            try:
+                features, gesture, _ = hand_recognition._analyze(frame)
+            except Exception as e:
+                print(f"Error in batch recognition of frame {seq}: {e}")
+                features, gesture = None, None
+            gestures.append(gesture)
+            table.append(features.as_row() if features is not None else None)
+        return gestures, table.table()
+
+    def settings(self):
+        """可在其他实例（如工作进程）上用 apply_settings 复现的识别参数"""
+        return {name: copy.deepcopy(getattr(self, name)) for name in self.SETTINGS}
+
+    def apply_settings(self, settings):
+        """应用 settings() 返回的参数"""
+        for name, value in settings.items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"unknown setting {name!r}")
+            setattr(self, name, copy.deepcopy(value))
+
+    def reset_tracking(self):
+        """清除跟踪和运动门控状态，下一帧执行全帧检测"""
+        self._track_bbox = None
+        self._frames_since_full = 0
+        self._motion_thumb = None
+        self._last_analysis = None
+
+    def _analyze(self, frame, color_space='BGR'):
+        """识别一帧，返回 (特征, 手势, 掩码)，未检测到手部时特征和手势为None"""
+        if self._scene_unchanged(frame) and self._last_analysis is not None:
+            return self._last_analysis
+
+        # 跟踪模式下只处理手部窗口
+        hand, mask = self._locate_hand(frame, color_space)
+        self._last_analysis = self.classify(hand) + (mask,)
+        return self._last_analysis
+
+    def segment(self, frame, color_space='BGR'):
+        """识别的前半段（运动门控、肤色分割和轮廓筛选），返回 (是否沿用上次结果, 手部)
+
+        手部为 (轮廓, 面积, 外接框)，未检测到时为None；场景静止时不做分割，手部为None，
+        调用方应沿用上一帧的结果。与 classify 配合可把两段放在不同线程中流水执行。
+        """
+        if self._scene_unchanged(frame):
+            return True, None
+        hand, _ = self._locate_hand(frame, color_space)
+        return False, hand
+
+    def segment_native(self, image, pixel_format):
+        """同 segment，输入为相机原始格式的图像（见 analyze_native）"""
+        return self.segment(*self._planar(image, pixel_format))
+
+    def classify(self, hand):
+        """识别的后半段：由 segment 得到的手部提取特征并判断手势，返回 (特征, 手势)"""
+        if hand is None:
+            return None, None
+        # 复用筛选轮廓时已算出的面积和外接框
+        features = self._extract_enhanced_features(*hand)
+        return features, self._recognize_gesture_enhanced(features)
+
+    def _scene_unchanged(self, frame):
+        """与上次完整计算时的缩略图比较，判断场景是否静止；需要重新计算时更新参考缩略图"""
+        params = self.motion_params
+        if not params['enabled']:
+            return False
+
+        thumb = cv2.resize(frame, params['thumb_size'], interpolation=cv2.INTER_AREA)
+        reference = self._motion_thumb
+        if (reference is not None and reference.shape == thumb.shape and
+                self._motion_reused < params['max_reuse'] and
+                cv2.norm(thumb, reference, cv2.NORM_INF) <= params['threshold']):
+            self._motion_reused += 1
+            return True
+
+        self._motion_thumb = thumb
+        self._motion_reused = 0
+        return False
+
+    def _locate_hand(self, frame, color_space='BGR'):
+        """定位手部，返回全帧坐标下的 (轮廓, 面积, 外接框) 和对应掩码"""
+        window = self._tracking_window(frame.shape)
+        if window is not None:
+            hand, mask = self._locate_in_window(frame, window, color_space)
+            if hand is not None:
+                self._track_bbox = hand[2]
+                self._frames_since_full += 1
+                return hand, mask
+
+        # 没有跟踪目标、手部移出窗口或到达重新检测周期时，执行全帧检测
+        hand, mask = self._locate_full_frame(frame, color_space)
+        self._track_bbox = hand[2] if hand is not None else None
+        self._track_shape = frame.shape[:2]
+        self._frames_since_full = 0
+        return hand, mask
+
+    def _locate_in_window(self, frame, window, color_space='BGR'):
+        """在窗口内预处理并查找轮廓，手部不完整位于窗口内时返回None"""
+        x0, y0, x1, y1 = window
+        mask = self._preprocess_image(frame, color_space=color_space, window=window)
+        hand = self._select_contour(mask, offset=(x0, y0))
+
+        if hand is None or self._leaves_window(hand[2], window, frame.shape):
+            return None, mask
+        return hand, mask
+
+    def _locate_full_frame(self, frame, color_space='BGR'):
+        """全帧检测；开启金字塔模式时先在低分辨率上分割，再在全分辨率裁剪区域上细化"""
+        scale = self._pyramid_scale(frame.shape)
+        if scale >= 1.0:
+            mask = self._preprocess_image(frame, color_space=color_space)
+            return self._select_contour(mask), mask
+
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        small_mask = self._preprocess_image(small, level='pyramid', color_space=color_space)
+        thresholds = self._level_thresholds(scale)
+        small_hand = self._select_contour(small_mask, min_area=thresholds['contour_area'])
+        if small_hand is None:
+            return None, small_mask
+
+        # 将低分辨率轮廓放大回原始坐标
+        contour = np.round(small_hand[0].astype(np.float32) / scale).astype(np.int32)
+        hand = (contour, cv2.contourArea(contour), cv2.boundingRect(contour))
+
+        # 面积不足以识别为手势时结果必然为unknown，省去全分辨率细化
+        if small_hand[1] < thresholds['min_area']:
+            return hand, small_mask
+
+        # 在全分辨率裁剪区域上重新分割，凸缺陷及其深度都在原始分辨率上计算
+        window = self._padded_window(hand[2], frame.shape, self.pyramid_params['refine_padding'])
+        refined, mask = self._locate_in_window(frame, window, color_space)
+        if refined is not None:
+            return refined, mask
+        return hand, small_mask
+
+    def _pyramid_scale(self, frame_shape):
+        """计算金字塔模式下的缩放比例，不需要缩放时返回1.0"""
+        params = self.pyramid_params
+        if not params['enabled']:
+            return 1.0
+        return min(1.0, params['max_width'] / frame_shape[1])
+
+    def _level_thresholds(self, scale):
+        """将面积阈值归一化到指定缩放层级"""
+        return {
+            'contour_area': self.gesture_params['min_contour_area'] * scale ** 2,
+            'min_area': self.gesture_params['min_area'] * scale ** 2,
+        }
 
-        for color_space_info in self.skin_ranges:
-            if color_space_info['color_space'] == 'YCrCb':
-                converted = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb)
-            else:  # HSV
-                converted = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    def _tracking_window(self, frame_shape):
+        """根据上一帧外接框计算处理窗口，需要全帧检测时返回None"""
+        params = self.tracking_params
+        if (not params['enabled'] or self._track_bbox is None or
+                self._track_shape != frame_shape[:2] or
+                self._frames_since_full >= params['reacquire_interval']):
+            return None
+        return self._padded_window(self._track_bbox, frame_shape, params['padding'])
+
+    @staticmethod
+    def _padded_window(bbox, frame_shape, padding):
+        """按比例扩展外接框并裁剪到图像范围内，返回 (x0, y0, x1, y1)"""
+        height, width = frame_shape[:2]
+        x, y, w, h = bbox
+        pad_x = int(w * padding)
+        pad_y = int(h * padding)
+        return (max(0, x - pad_x), max(0, y - pad_y),
+                min(width, x + w + pad_x), min(height, y + h + pad_y))
+
+    @staticmethod
+    def _leaves_window(bbox, window, frame_shape):
+        """外接框是否触及窗口的内部边界（即手部可能已移出窗口）"""
+        height, width = frame_shape[:2]
+        x0, y0, x1, y1 = window
+        x, y, w, h = bbox
+        return ((x <= x0 and x0 > 0) or (y <= y0 and y0 > 0) or
+                (x + w >= x1 and x1 < width) or (y + h >= y1 and y1 < height))
+
+    def _select_contour(self, mask, offset=(0, 0), min_area=None):
+        """从掩码中选取面积最大的有效轮廓，返回 (轮廓, 面积, 外接框)，没有时返回None
+
+        min_area 默认为全分辨率下的 gesture_params['min_contour_area']。
+        """
+        if min_area is None:
+            min_area = self.gesture_params['min_contour_area']
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+
+        # 筛选有效轮廓：外接框面积不超过阈值的轮廓不可能满足面积要求，无需计算面积
+        best = None
+        for cnt in contours:
+            bbox = cv2.boundingRect(cnt)
+            if bbox[2] * bbox[3] <= min_area:
+                continue
+            area = cv2.contourArea(cnt)
+            if area > min_area and (best is None or area > best[1]):
+                best = (cnt, area, bbox)
+        return best
+
+    def _preprocess_image(self, frame, level='frame', color_space='BGR', window=None):
+        """增强的图像预处理，frame 为 color_space 颜色空间的三通道图像，返回 window=(x0, y0, x1, y1) 内的掩码
+
+        窗口内的掩码按完整上下文计算（窗口向外扩展 halo 后计算再裁剪），与整帧计算后裁剪的结果一致。
+        window 为None时处理整幅图像。
+        """
+        height, width = frame.shape[:2]
+        if window is None:
+            window = (0, 0, width, height)
+
+        params = self.incremental_params
+        if not params['enabled']:
+            return self._windowed_mask(frame, window, lambda region: self._compute_mask(region, level, color_space))
+
+        # 分类器变化（肤色范围或颜色空间不同）时旧掩码作废
+        skin_lut = self._get_skin_lut(color_space)
+        compute = lambda region: self._compute_mask(region, level, color_space, skin_lut)
+        return self._incremental[level].update(frame, window, skin_lut.key, compute, params['tile'],
+                                               self.MASK_HALO, params['max_dirty_ratio'])
+
+    def _windowed_mask(self, frame, window, compute):
+        """在窗口向外扩展 halo 的区域上计算掩码，返回窗口内的部分"""
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = window
+        halo = self.MASK_HALO
+        ex0, ey0 = max(0, x0 - halo), max(0, y0 - halo)
+        ex1, ey1 = min(width, x1 + halo), min(height, y1 + halo)
+        return compute(frame[ey0:ey1, ex0:ex1])[y0 - ey0:y1 - ey0, x0 - ex0:x1 - ex0]
+
+    def _compute_mask(self, frame, level='frame', color_space='BGR', skin_lut=None):
+        """对整幅图像执行预处理得到肤色掩码"""
+        if skin_lut is None:
+            skin_lut = self._get_skin_lut(color_space)
+
+        blurred, filtered, quantized, index, final_mask, mask_tmp = self._arenas[level].views(frame.shape)
 
-            space_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-            for lower, upper in color_space_info['ranges']:
-                mask = cv2.inRange(converted, np.array(lower), np.array(upper))
-                space_mask = cv2.bitwise_or(space_mask, mask)
+        # 降噪和平滑
+        cv2.GaussianBlur(frame, (3, 3), 0, dst=blurred)
+        cv2.bilateralFilter(blurred, 5, 75, 75, dst=filtered)  # 添加双边滤波
 
-            final_mask = cv2.bitwise_or(final_mask, space_mask)
+        # 肤色分类
+        skin_lut.classify(filtered, dst=mask_tmp, quantized=quantized, index=index)
 
         # 改进的形态学操作
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        final_mask = cv2.morphologyEx(final_mask, cv2.MORPH_CLOSE, kernel, iterations=2)
-        final_mask = cv2.morphologyEx(final_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+        cv2.morphologyEx(mask_tmp, cv2.MORPH_CLOSE, self._morph_kernel, dst=final_mask, iterations=2)
+        cv2.morphologyEx(final_mask, cv2.MORPH_OPEN, self._morph_kernel, dst=mask_tmp, iterations=1)
 
         # 添加额外的噪声过滤
-        final_mask = cv2.medianBlur(final_mask, 5)
+        cv2.medianBlur(mask_tmp, 5, dst=final_mask)
 
         return final_mask
 
-    def _extract_enhanced_features(self, contour):
-        """增强的特征提取"""
-        features = {}
-
-        # 基本特征
-        features['contour'] = contour
-        features['area'] = cv2.contourArea(contour)
-        features['hull'] = cv2.convexHull(contour)
-        features['hull_area'] = cv2.contourArea(features['hull'])
-        features['solidity'] = features['area'] / features['hull_area'] if features['hull_area'] > 0 else 0
-
-        # 轮廓分析
-        features['bbox'] = cv2.boundingRect(contour)
-        features['extent'] = features['area'] / (features['bbox'][2] * features['bbox'][3])
+    def _get_skin_lut(self, color_space='BGR'):
+        """获取与当前 skin_ranges 和输入颜色空间对应的肤色分类器，配置变化时重新构造"""
+        bits = self.skin_lut_bits if color_space == 'BGR' else self.yuv_lut_bits
+        key = SkinLUT.config_key(self.skin_ranges, bits, color_space)
+        lut = self._skin_luts.get(color_space)
+        if lut is None or lut.key != key:
+            if bits is None:
+                lut = SkinClassifier(self.skin_ranges)
+            else:
+                lut = SkinLUT(self.skin_ranges, bits=bits, input_space=color_space)
+            self._skin_luts[color_space] = lut
+        return lut
+
+    def _extract_enhanced_features(self, contour, area=None, bbox=None):
+        """增强的特征提取，每个几何量只计算一次并共享给手指检测和识别，返回 HandFeatures"""
+        if area is None:
+            area = cv2.contourArea(contour)
+        if bbox is None:
+            bbox = cv2.boundingRect(contour)
+
+        # 凸包只计算一次索引，凸包点由索引取得
+        hull_indices = cv2.convexHull(contour, returnPoints=False)
+        hull = contour[hull_indices[:, 0]]
+
+        # 基本特征和轮廓分析
+        features = HandFeatures(contour, hull, area, cv2.contourArea(hull), bbox)
 
         # 指尖检测
-        features.update(self._detect_fingers(contour))
+        self._detect_fingers(features, hull_indices)
 
         return features
 
-    def _detect_fingers(self, contour):
-        """简化的手指检测，主要关注凸缺陷点"""
-        hull = cv2.convexHull(contour, returnPoints=False)
-        defects = cv2.convexityDefects(contour, hull)
-
-        valid_defects = []
-        x, y, w, h = cv2.boundingRect(contour)
-        center = (x + w // 2, y + h // 2)
-
-        # 面积检查
-        area = cv2.contourArea(contour)
-        if area < self.gesture_params['min_area']:
-            return {
-                'valid_defects': [],
-                'defect_count': 0,
-                'center': center,
-                'bbox': (x, y, w, h)
-            }
+    def _detect_fingers(self, features, hull_indices=None):
+        """简化的手指检测，主要关注凸缺陷点，结果写入 features 的凸缺陷数组"""
+        contour = features.contour
+        x, y, w, h = features.bbox
 
-        if defects is not None:
-            for i in range(defects.shape[0]):
-                s, e, f, d = defects[i, 0]
-                start = tuple(contour[s][0])
-                end = tuple(contour[e][0])
-                far = tuple(contour[f][0])
-
-                # 计算角度
-                a = np.linalg.norm(np.array(end) - np.array(start))
-                b = np.linalg.norm(np.array(far) - np.array(start))
-                c = np.linalg.norm(np.array(end) - np.array(far))
-                angle = np.degrees(np.arccos((b ** 2 + c ** 2 - a ** 2) / (2 * b * c)))
-
-                # 简化的检测条件
-                min_angle, max_angle = self.gesture_params['defect_angle_range']
-                if (min_angle <= angle <= max_angle and
-                        d > self.gesture_params['min_defect_depth'] and
-                        far[1] < y + 0.8 * h):  # 确保凸缺陷点在手掌上部
-                    valid_defects.append((start, end, far))
+        # 面积检查，面积不足时无需计算凸缺陷
+        if features.area < self.gesture_params['min_area']:
+            return
 
-        return {
-            'valid_defects': valid_defects,
-            'defect_count': len(valid_defects),
-            'center': center,
-            'bbox': (x, y, w, h)
-        }
+        if hull_indices is None:
+            hull_indices = cv2.convexHull(contour, returnPoints=False)
+        defects = cv2.convexityDefects(contour, hull_indices)
+
+        if defects is not None:
+            # 按索引一次性取出所有起点、终点和最远点
+            defects = defects.reshape(-1, 4)
+            points = contour.reshape(-1, 2)
+            starts = points[defects[:, 0]]
+            ends = points[defects[:, 1]]
+            fars = points[defects[:, 2]]
+            depths = defects[:, 3]
+
+            # 批量计算角度
+            a = np.linalg.norm(ends - starts, axis=1)
+            b = np.linalg.norm(fars - starts, axis=1)
+            c = np.linalg.norm(ends - fars, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                angles = np.degrees(np.arccos((b ** 2 + c ** 2 - a ** 2) / (2 * b * c)))
+
+            # 简化的检测条件
+            min_angle, max_angle = self.gesture_params['defect_angle_range']
+            keep = ((angles >= min_angle) & (angles <= max_angle) &
+                    (depths > self.gesture_params['min_defect_depth']) &
+                    (fars[:, 1] < y + 0.8 * h))  # 确保凸缺陷点在手掌上部
+
+            features.set_defects(starts[keep], ends[keep], fars[keep])
 
     def _recognize_gesture_enhanced(self, features):
         """基于凸缺陷点数量的简化手势识别"""
-        defect_count = features['defect_count']
-
-        # 计算轮廓的紧凑度
-        solidity = features['area'] / features['hull_area'] if features['hull_area'] > 0 else 0
+        defect_count = features.defect_count
 
         # 必须满足基本的面积和紧凑度要求
-        if features['area'] < self.gesture_params['min_area'] or solidity < self.gesture_params['min_solidity']:
+        if (features.area < self.gesture_params['min_area'] or
+                features.solidity < self.gesture_params['min_solidity']):
             return "unknown"
 
         # 基于凸缺陷点数量判断手势
@@ -169,26 +610,32 @@ class HandRecognition:
 
         return "unknown"
 
-    def _draw_enhanced_feedback(self, frame, features, gesture, mask):
-        """简化的视觉反馈"""
-        # 绘制轮廓
-        cv2.drawContours(frame, [features['contour']], -1, (0, 255, 0), 2)
+    def build_overlay(self, features, gesture):
+        """按 render_policy 生成视觉反馈的图元列表（见 overlay 模块），未检测到手部或策略为 'off' 时为空列表"""
+        if features is None or self.render_policy == 'off':
+            return []
+
+        x, y, w, h = features.bbox
+        if self.render_policy == 'minimal':
+            return [overlay.rect(features.bbox, (0, 255, 0)),
+                    overlay.text((x, y - 10), f"{gesture}", (255, 0, 0), 1)]
+
+        # 轮廓
+        primitives = [overlay.contour(features.contour, (0, 255, 0))]
 
         # 只绘制凸缺陷点（红点）
-        for _, _, far in features['valid_defects']:
-            cv2.circle(frame, far, 8, (0, 0, 255), -1)  # 凸缺陷点（红色）
+        for far in features.defect_points().tolist():
+            primitives.append(overlay.circle(far, 8, (0, 0, 255)))  # 凸缺陷点（红色）
 
-        # 显示手势结果
-        x, y, w, h = features['bbox']
-        cv2.putText(frame, f"{gesture}", (x, y - 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+        # 手势结果
+        primitives.append(overlay.text((x, y - 20), f"{gesture}", (255, 0, 0), 1))
 
-        # 显示调试信息
+        # 调试信息
         debug_info = [
-            f"Defects: {features['defect_count']}",
+            f"Defects: {features.defect_count}",
             f"Gesture: {gesture}"
         ]
 
-        for i, text in enumerate(debug_info):
-            cv2.putText(frame, text, (10, 30 + i * 25),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
\ No newline at end of file
+        for i, line in enumerate(debug_info):
+            primitives.append(overlay.text((10, 30 + i * 25), line, (0, 255, 0)))
+        return primitives
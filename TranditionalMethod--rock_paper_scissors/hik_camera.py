@@ -0,0 +1,365 @@
+import os
+import sys
+import time
+import weakref
+from ctypes import CFUNCTYPE, POINTER, c_ubyte, c_void_p, cast
+
+import cv2
+import numpy as np
+
+from capture import BoundedFrameQueue, CapturedFrame
+
+# 海康SDK的头文件之间使用绝对导入，需要把 MvImport_Linux 加入搜索路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MvImport_Linux'))
+
+from MvImport_Linux.MvCameraControl_class import MvCamera
+from MvImport_Linux.CameraParams_const import MV_ACCESS_Exclusive, MV_GIGE_DEVICE, MV_USB_DEVICE
+from MvImport_Linux.CameraParams_header import (MV_CC_DEVICE_INFO, MV_CC_DEVICE_INFO_LIST, MV_FRAME_OUT,
+                                                MV_FRAME_OUT_INFO_EX, MV_TRIGGER_MODE_OFF)
+from MvImport_Linux.MvErrorDefine_const import MV_OK
+from MvImport_Linux.PixelType_header import (PixelType_Gvsp_BayerBG8, PixelType_Gvsp_BayerGB8,
+                                             PixelType_Gvsp_BayerGR8, PixelType_Gvsp_BayerRG8,
+                                             PixelType_Gvsp_BGR8_Packed, PixelType_Gvsp_Mono8,
+                                             PixelType_Gvsp_RGB8_Packed, PixelType_Gvsp_YUV422_Packed,
+                                             PixelType_Gvsp_YUV422_YUYV_Packed)
+
+
+# 像素格式 -> 每像素通道数（均为8位）
+PIXEL_CHANNELS = {
+    PixelType_Gvsp_Mono8: 1,
+    PixelType_Gvsp_BayerRG8: 1,
+    PixelType_Gvsp_BayerGR8: 1,
+    PixelType_Gvsp_BayerGB8: 1,
+    PixelType_Gvsp_BayerBG8: 1,
+    PixelType_Gvsp_YUV422_YUYV_Packed: 2,
+    PixelType_Gvsp_YUV422_Packed: 2,  # UYVY
+    PixelType_Gvsp_RGB8_Packed: 3,
+    PixelType_Gvsp_BGR8_Packed: 3,
+}
+
+# 像素格式 -> 转换为BGR的OpenCV转换码，BGR8本身为None
+BGR_CONVERSIONS = {
+    PixelType_Gvsp_Mono8: cv2.COLOR_GRAY2BGR,
+    PixelType_Gvsp_BayerRG8: cv2.COLOR_BayerRGGB2BGR,
+    PixelType_Gvsp_BayerGR8: cv2.COLOR_BayerGRBG2BGR,
+    PixelType_Gvsp_BayerGB8: cv2.COLOR_BayerGBRG2BGR,
+    PixelType_Gvsp_BayerBG8: cv2.COLOR_BayerBGGR2BGR,
+    PixelType_Gvsp_YUV422_YUYV_Packed: cv2.COLOR_YUV2BGR_YUYV,
+    PixelType_Gvsp_YUV422_Packed: cv2.COLOR_YUV2BGR_UYVY,
+    PixelType_Gvsp_RGB8_Packed: cv2.COLOR_RGB2BGR,
+    PixelType_Gvsp_BGR8_Packed: None,
+}
+
+# 像素格式 -> HandRecognition.analyze_native 可直接处理的原始格式名
+NATIVE_FORMATS = {
+    PixelType_Gvsp_YUV422_YUYV_Packed: 'YUYV',
+    PixelType_Gvsp_YUV422_Packed: 'UYVY',
+    PixelType_Gvsp_BayerRG8: 'BayerRG',
+    PixelType_Gvsp_BayerGR8: 'BayerGR',
+    PixelType_Gvsp_BayerGB8: 'BayerGB',
+    PixelType_Gvsp_BayerBG8: 'BayerBG',
+}
+
+# 协商原始格式时的默认优先顺序：YUV422可以完全绕开BGR，Bayer链路带宽最小
+NATIVE_FORMAT_PREFERENCE = (
+    PixelType_Gvsp_YUV422_YUYV_Packed,
+    PixelType_Gvsp_YUV422_Packed,
+    PixelType_Gvsp_BayerRG8,
+    PixelType_Gvsp_BayerGR8,
+    PixelType_Gvsp_BayerGB8,
+    PixelType_Gvsp_BayerBG8,
+)
+
+# 取流回调原型：void cbOutput(unsigned char* pData, MV_FRAME_OUT_INFO_EX* pFrameInfo, void* pUser)
+FrameCallback = CFUNCTYPE(None, POINTER(c_ubyte), POINTER(MV_FRAME_OUT_INFO_EX), c_void_p)
+
+
+class HikCameraError(RuntimeError):
+    """海康SDK调用失败"""
+
+    def __init__(self, message, ret=None):
+        if ret is not None:
+            message = f"{message} ret[0x{ret & 0xFFFFFFFF:x}]"
+        super().__init__(message)
+        self.ret = ret
+
+
+def frame_view(buf_addr, frame_info, pixel_type=None):
+    """按帧信息把SDK图像缓存解释为NumPy数组（不复制，与SDK缓存共享内存）"""
+    if pixel_type is None:
+        pixel_type = frame_info.enPixelType
+    channels = PIXEL_CHANNELS.get(pixel_type)
+    if channels is None:
+        raise ValueError(f"unsupported pixel type 0x{pixel_type:x}")
+
+    width = frame_info.nExtendWidth or frame_info.nWidth
+    height = frame_info.nExtendHeight or frame_info.nHeight
+    count = width * height * channels
+    if frame_info.nFrameLen < count:
+        raise ValueError(f"frame length {frame_info.nFrameLen} is smaller than {width}x{height}x{channels}")
+
+    flat = np.ctypeslib.as_array(buf_addr, shape=(count,))
+    return flat.reshape((height, width) if channels == 1 else (height, width, channels))
+
+
+def to_bgr(image, pixel_type):
+    """把SDK原始图像转换为新分配的BGR图像"""
+    code = BGR_CONVERSIONS[pixel_type]
+    if code is None:
+        return image.copy()
+    return cv2.cvtColor(image, code)
+
+
+class HikFrameLease:
+    """SDK图像缓存租约：image 直接引用SDK内存，release() 或离开 with 块时归还缓存
+
+    归还后 image 失效，需要长期保存的数据应在归还前复制。
+    """
+
+    def __init__(self, camera, frame_out, timestamp):
+        self._camera = camera
+        self._frame_out = frame_out
+        self.timestamp = timestamp
+        self.frame_info = frame_out.stFrameInfo
+        self.pixel_type = self.frame_info.enPixelType
+        self.frame_number = self.frame_info.nFrameNum
+        self.native_format = NATIVE_FORMATS.get(self.pixel_type)  # 可直接交给 analyze_native 时非None
+        self.image = frame_view(frame_out.pBufAddr, self.frame_info)
+
+    @property
+    def released(self):
+        return self._frame_out is None
+
+    def to_bgr(self):
+        """转换为独立的BGR图像，可在归还后继续使用"""
+        return to_bgr(self.image, self.pixel_type)
+
+    def release(self):
+        """归还SDK图像缓存，重复调用无副作用"""
+        if self._frame_out is None:
+            return
+        self.image = None
+        frame_out, self._frame_out = self._frame_out, None
+        ret = self._camera.MV_CC_FreeImageBuffer(frame_out)
+        if ret != MV_OK:
+            print(f"Error freeing Hik image buffer: ret[0x{ret:x}]")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __del__(self):
+        # 兜底：使用者忘记归还时避免SDK缓存耗尽
+        if self._frame_out is not None:
+            self.release()
+
+
+class HikFrameSource:
+    """基于 MV_CC_GetImageBuffer/MV_CC_FreeImageBuffer 的海康相机帧源，帧以零拷贝视图的形式借出
+
+    pixel_formats 为按优先顺序尝试设置的像素格式，全部失败时保持相机当前格式；
+    使用 NATIVE_FORMAT_PREFERENCE 时可把 lease.image 直接交给 HandRecognition.analyze_native。
+    """
+
+    def __init__(self, device_index=0, timeout_ms=1000, layer_type=MV_GIGE_DEVICE | MV_USB_DEVICE,
+                 pixel_formats=()):
+        self.device_index = device_index
+        self.timeout_ms = timeout_ms
+        self.layer_type = layer_type
+        self.pixel_formats = tuple(pixel_formats)
+        self.pixel_format = None  # 协商成功的像素格式
+        self.camera = None
+        self.is_opened = False
+        self._leases = weakref.WeakSet()  # 尚未归还的租约，关闭相机前统一归还
+
+    def open(self):
+        """枚举并打开相机，关闭触发模式后开始取流"""
+        device_list = MV_CC_DEVICE_INFO_LIST()
+        ret = MvCamera.MV_CC_EnumDevices(self.layer_type, device_list)
+        if ret != MV_OK:
+            raise HikCameraError("enum devices fail!", ret)
+        if self.device_index >= device_list.nDeviceNum:
+            raise HikCameraError(f"device {self.device_index} not found, {device_list.nDeviceNum} available")
+
+        device_info = cast(device_list.pDeviceInfo[self.device_index], POINTER(MV_CC_DEVICE_INFO)).contents
+        camera = MvCamera()
+        ret = camera.MV_CC_CreateHandle(device_info)
+        if ret != MV_OK:
+            raise HikCameraError("create handle fail!", ret)
+
+        ret = camera.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0)
+        if ret != MV_OK:
+            camera.MV_CC_DestroyHandle()
+            raise HikCameraError("open device fail!", ret)
+
+        self.camera = camera
+        self._configure()
+
+        ret = camera.MV_CC_StartGrabbing()
+        if ret != MV_OK:
+            self.close()
+            raise HikCameraError("start grabbing fail!", ret)
+
+        self.is_opened = True
+        return self
+
+    def acquire(self, timeout_ms=None):
+        """借出一帧，返回 HikFrameLease；超时或出错时返回None"""
+        frame_out = MV_FRAME_OUT()  # ctypes结构体创建时已清零
+        ret = self.camera.MV_CC_GetImageBuffer(frame_out, self.timeout_ms if timeout_ms is None else timeout_ms)
+        timestamp = time.monotonic()
+        if ret != MV_OK or not frame_out.pBufAddr:
+            return None
+
+        try:
+            lease = HikFrameLease(self.camera, frame_out, timestamp)
+        except ValueError as e:
+            print(f"Error in Hik acquire: {e}")
+            self.camera.MV_CC_FreeImageBuffer(frame_out)
+            return None
+        self._leases.add(lease)
+        return lease
+
+    def read(self):
+        """与 cv2.VideoCapture.read 兼容：返回 (ret, BGR图像)，图像与SDK缓存无关"""
+        lease = self.acquire()
+        if lease is None:
+            return False, None
+        with lease:
+            return True, lease.to_bgr()
+
+    def read_native(self):
+        """返回 (ret, 图像, 原始格式名)：可交给 analyze_native 的格式复制原始图像，其余格式转换为BGR、格式名为None"""
+        lease = self.acquire()
+        if lease is None:
+            return False, None, None
+        with lease:
+            if lease.native_format is None:
+                return True, lease.to_bgr(), None
+            return True, lease.image.copy(), lease.native_format
+
+    def release(self):
+        """与 cv2.VideoCapture.release 兼容"""
+        self.close()
+
+    def close(self):
+        """归还所有未归还的租约（其 image 随之失效），然后停止取流并关闭相机"""
+        if self.camera is None:
+            return
+        for lease in list(self._leases):
+            lease.release()
+        self._leases.clear()
+        if self.is_opened:
+            self.camera.MV_CC_StopGrabbing()
+        self.camera.MV_CC_CloseDevice()
+        self.camera.MV_CC_DestroyHandle()
+        self.camera = None
+        self.is_opened = False
+
+    def _configure(self):
+        """打开后、取流前的相机配置"""
+        ret = self.camera.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF)
+        if ret != MV_OK:
+            print(f"Error setting trigger mode: ret[0x{ret:x}]")
+
+        for pixel_format in self.pixel_formats:
+            if self.camera.MV_CC_SetEnumValue("PixelFormat", pixel_format) == MV_OK:
+                self.pixel_format = pixel_format
+                break
+        else:
+            if self.pixel_formats:
+                print("Error setting pixel format: none of the requested formats is supported")
+
+
+class HikCallbackSource(HikFrameSource):
+    """回调取流的海康相机帧源：SDK一出图就在回调里复制进有界队列，识别端从队列拉取
+
+    bgr=True 时注册 MV_CC_RegisterImageCallBackForBGR，由SDK完成格式转换；
+    否则注册 MV_CC_RegisterImageCallBackEx，拿到原始格式，在读取端转换为BGR；
+    此时 native=True 则 latest() 对 NATIVE_FORMATS 中的格式不做转换，交出原始图像。
+    提供与 CaptureThread 相同的 latest()/stats()，可直接交给 RecognitionWorker。
+    """
+
+    def __init__(self, device_index=0, queue_size=2, policy='drop_oldest', bgr=True, timeout_ms=1000,
+                 layer_type=MV_GIGE_DEVICE | MV_USB_DEVICE, pixel_formats=(), native=False):
+        super().__init__(device_index, timeout_ms, layer_type, pixel_formats)
+        self.bgr = bgr
+        self.native = native and not bgr
+        self.queue = BoundedFrameQueue(queue_size, policy)
+        self.failures = 0
+        self._next_id = 0
+        # 回调对象必须一直被引用，否则会被回收而导致SDK调用野指针
+        self._callback = FrameCallback(self._on_frame)
+
+    def latest(self, timeout=0):
+        """取出队列中最新的一帧（CapturedFrame），更早的帧计为丢弃；没有帧时返回None
+
+        native=True 时可交给 analyze_native 的格式保持原始图像（pixel_format 为格式名），其余转换为BGR。
+        """
+        return self._take(timeout, self.native)
+
+    def read(self):
+        """与 cv2.VideoCapture.read 兼容：最多等待 timeout_ms 取一帧BGR图像"""
+        captured = self._take(self.timeout_ms / 1000, native=False)
+        if captured is None:
+            return False, None
+        return True, captured.frame
+
+    def read_native(self):
+        """同 HikFrameSource.read_native，最多等待 timeout_ms"""
+        captured = self._take(self.timeout_ms / 1000, native=True)
+        if captured is None:
+            return False, None, None
+        return True, captured.frame, captured.pixel_format
+
+    def _take(self, timeout, native):
+        item = self.queue.get_latest(timeout)
+        if item is None:
+            return None
+        captured, pixel_type = item
+        native_format = NATIVE_FORMATS.get(pixel_type) if native else None
+        if native_format is not None:
+            return captured._replace(pixel_format=native_format)
+        if pixel_type == PixelType_Gvsp_BGR8_Packed:
+            return captured
+        return captured._replace(frame=to_bgr(captured.frame, pixel_type))
+
+    def acquire(self, timeout_ms=None):
+        raise RuntimeError("HikCallbackSource delivers frames through its queue, use latest() instead")
+
+    def stats(self):
+        """采集统计：回调收到的帧数（含队满被拒的帧）、丢弃的帧数（队满或被更新的帧跳过）和无法解析的帧数"""
+        return {
+            'captured': self._next_id,
+            'dropped': self.queue.dropped + self.queue.skipped,
+            'failures': self.failures,
+        }
+
+    def _configure(self):
+        """回调须在开始取流前注册"""
+        super()._configure()
+        if self.bgr:
+            ret = self.camera.MV_CC_RegisterImageCallBackForBGR(self._callback, None)
+        else:
+            ret = self.camera.MV_CC_RegisterImageCallBackEx(self._callback, None)
+        if ret != MV_OK:
+            self.close()
+            raise HikCameraError("register image callback fail!", ret)
+
+    def _on_frame(self, p_data, p_frame_info, p_user):
+        """SDK回调线程：pData 只在回调期间有效，复制后立即返回"""
+        timestamp = time.monotonic()
+        try:
+            frame_info = p_frame_info.contents
+            pixel_type = PixelType_Gvsp_BGR8_Packed if self.bgr else frame_info.enPixelType
+            image = frame_view(p_data, frame_info, pixel_type).copy()
+        except ValueError as e:
+            # 异常不能抛回C代码
+            self.failures += 1
+            print(f"Error in Hik frame callback: {e}")
+            return
+
+        self._next_id += 1
+        self.queue.put((CapturedFrame(self._next_id, timestamp, image), pixel_type))
@@ -0,0 +1,302 @@
+import threading
+import time
+from ctypes import POINTER, c_ubyte, c_void_p, cast, memmove, pointer
+
+import cv2
+import numpy as np
+
+import hik_camera  # 确保 MvImport_Linux 已加入搜索路径
+from frame_sources import synthetic_frames
+from MvImport_Linux.MvCameraControl_class import MvCamCtrldll
+from MvImport_Linux.CameraParams_const import MV_USB_DEVICE
+from MvImport_Linux.CameraParams_header import MV_CC_DEVICE_INFO, MV_FRAME_OUT_INFO_EX
+from MvImport_Linux.MvErrorDefine_const import (MV_E_CALLORDER, MV_E_HANDLE, MV_E_NOENOUGH_BUF, MV_E_NODATA,
+                                                MV_E_PARAMETER, MV_E_SUPPORT, MV_OK)
+from MvImport_Linux.PixelType_header import PixelType_Gvsp_BGR8_Packed
+
+
+def _bayer_mosaic(pattern):
+    """按 Bayer 排列（如 'RGGB'）从BGR图像中采样出单通道马赛克"""
+    channel = {'B': 0, 'G': 1, 'R': 2}
+
+    def convert(bgr):
+        mosaic = np.empty(bgr.shape[:2], dtype=np.uint8)
+        for i, color in enumerate(pattern):
+            dy, dx = divmod(i, 2)
+            mosaic[dy::2, dx::2] = bgr[dy::2, dx::2, channel[color]]
+        return mosaic
+
+    return convert
+
+
+# 模拟相机支持的像素格式 -> BGR转换为该格式的函数
+FROM_BGR = {
+    hik_camera.PixelType_Gvsp_BGR8_Packed: lambda bgr: bgr,
+    hik_camera.PixelType_Gvsp_RGB8_Packed: lambda bgr: cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB),
+    hik_camera.PixelType_Gvsp_Mono8: lambda bgr: cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY),
+    hik_camera.PixelType_Gvsp_YUV422_YUYV_Packed: lambda bgr: cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_YUYV),
+    hik_camera.PixelType_Gvsp_YUV422_Packed: lambda bgr: cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_UYVY),
+    hik_camera.PixelType_Gvsp_BayerRG8: _bayer_mosaic('RGGB'),
+    hik_camera.PixelType_Gvsp_BayerGR8: _bayer_mosaic('GRBG'),
+    hik_camera.PixelType_Gvsp_BayerGB8: _bayer_mosaic('GBRG'),
+    hik_camera.PixelType_Gvsp_BayerBG8: _bayer_mosaic('BGGR'),
+}
+
+
+class _MockDevice:
+    """一台模拟相机的状态"""
+
+    def __init__(self, buffer_count):
+        self.opened = False
+        self.grabbing = False
+        self.pixel_format = PixelType_Gvsp_BGR8_Packed
+        self.buffer_count = buffer_count
+        self.outstanding = {}  # 已借出的缓存：地址 -> 数组
+        self.frame_num = 0
+        self.next_due = 0.0
+        self.callback = None  # (回调, pUser, 是否转换为BGR)
+        self.thread = None
+
+
+class MockMvCamCtrl:
+    """进程内模拟的 libMvCameraControl，实现枚举、打开、取流、借还缓存和回调接口
+
+    frames 为 index -> BGR图像 的函数（见 frame_sources.synthetic_frames、file_frames），
+    fps 为出图帧率，为0时不限速；buffer_count 为SDK缓存个数，借出未还时取流会超时。
+    未实现的 MV_ 接口返回 MV_E_SUPPORT。
+    """
+
+    def __init__(self, frames=None, fps=30.0, device_count=1, buffer_count=4, model_name='MockCam'):
+        self.frames = frames if frames is not None else synthetic_frames()
+        self.fps = fps
+        self.device_count = device_count
+        self.buffer_count = buffer_count
+        self.model_name = model_name
+        self._devices = {}
+        self._next_handle = 0
+        self._device_infos = []  # 保持枚举结果中结构体的引用
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if not name.startswith('MV_'):
+            raise AttributeError(name)
+        return lambda *args: MV_E_SUPPORT
+
+    # 设备枚举与句柄
+
+    def MV_CC_EnumDevices(self, layer_type, device_list_ref):
+        device_list = device_list_ref._obj
+        layer_type = getattr(layer_type, 'value', layer_type)
+        self._device_infos = []
+        if layer_type & MV_USB_DEVICE:
+            for i in range(self.device_count):
+                info = MV_CC_DEVICE_INFO()
+                info.nTLayerType = MV_USB_DEVICE
+                name = f"{self.model_name}{i}".encode('ascii')
+                memmove(info.SpecialInfo.stUsb3VInfo.chModelName, name, len(name))
+                self._device_infos.append(info)
+                device_list.pDeviceInfo[i] = pointer(info)
+        device_list.nDeviceNum = len(self._device_infos)
+        return MV_OK
+
+    def MV_CC_CreateHandle(self, handle_ref, device_info_ref):
+        with self._lock:
+            self._next_handle += 1
+            self._devices[self._next_handle] = _MockDevice(self.buffer_count)
+        handle_ref._obj.contents.value = self._next_handle
+        return MV_OK
+
+    def MV_CC_DestroyHandle(self, handle):
+        device = self._devices.pop(handle.contents.value or 0, None)
+        if device is None:
+            return MV_E_HANDLE
+        self._stop(device)
+        return MV_OK
+
+    def MV_CC_OpenDevice(self, handle, access_mode=1, switchover_key=0):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        device.opened = True
+        return MV_OK
+
+    def MV_CC_CloseDevice(self, handle):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        self._stop(device)
+        device.opened = False
+        return MV_OK
+
+    def MV_CC_IsDeviceConnected(self, handle):
+        device = self._device(handle)
+        return device is not None and device.opened
+
+    # 参数
+
+    def MV_CC_SetEnumValue(self, handle, key, value):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        value = getattr(value, 'value', value)
+        if key == b'PixelFormat':
+            if device.grabbing or value not in FROM_BGR:
+                return MV_E_PARAMETER
+            device.pixel_format = value
+        return MV_OK
+
+    def MV_CC_SetIntValue(self, handle, key, value):
+        return MV_OK if self._device(handle) is not None else MV_E_HANDLE
+
+    MV_CC_SetIntValueEx = MV_CC_SetIntValue
+    MV_CC_SetFloatValue = MV_CC_SetIntValue
+    MV_CC_SetBoolValue = MV_CC_SetIntValue
+
+    # 取流
+
+    def MV_CC_RegisterImageCallBackEx(self, handle, callback, user):
+        return self._register(handle, callback, user, bgr=False)
+
+    def MV_CC_RegisterImageCallBackForBGR(self, handle, callback, user):
+        return self._register(handle, callback, user, bgr=True)
+
+    def MV_CC_StartGrabbing(self, handle):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        if not device.opened or device.grabbing:
+            return MV_E_CALLORDER
+        device.grabbing = True
+        device.next_due = time.monotonic()
+        if device.callback is not None:
+            device.thread = threading.Thread(target=self._callback_loop, args=(device,),
+                                             name='MockMvCallback', daemon=True)
+            device.thread.start()
+        return MV_OK
+
+    def MV_CC_StopGrabbing(self, handle):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        if not device.grabbing:
+            return MV_E_CALLORDER
+        self._stop(device)
+        return MV_OK
+
+    def MV_CC_GetImageBuffer(self, handle, frame_ref, timeout_ms):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        if not device.grabbing or device.callback is not None:
+            return MV_E_CALLORDER
+        if len(device.outstanding) >= device.buffer_count:
+            # 缓存全部借出未还，真实SDK同样取不到新帧
+            time.sleep(timeout_ms / 1000)
+            return MV_E_NODATA
+
+        image = self._next_frame(device, timeout_ms, bgr=False)
+        if image is None:
+            return MV_E_NODATA
+
+        frame_out = frame_ref._obj
+        frame_out.pBufAddr = image.ctypes.data_as(POINTER(c_ubyte))
+        self._fill_info(frame_out.stFrameInfo, device, image, device.pixel_format)
+        device.outstanding[image.ctypes.data] = image
+        return MV_OK
+
+    def MV_CC_FreeImageBuffer(self, handle, frame_ref):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        address = cast(frame_ref._obj.pBufAddr, c_void_p).value
+        if device.outstanding.pop(address, None) is None:
+            return MV_E_PARAMETER
+        return MV_OK
+
+    def MV_CC_GetOneFrameTimeout(self, handle, data, data_size, info_ref, timeout_ms=1000):
+        return self._copy_frame(handle, data, data_size, info_ref, timeout_ms, bgr=False)
+
+    def MV_CC_GetImageForBGR(self, handle, data, data_size, info_ref, timeout_ms):
+        return self._copy_frame(handle, data, data_size, info_ref, timeout_ms, bgr=True)
+
+    # 内部实现
+
+    def _device(self, handle):
+        return self._devices.get(handle.contents.value or 0)
+
+    def _register(self, handle, callback, user, bgr):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        if device.grabbing:
+            return MV_E_CALLORDER
+        device.callback = (callback, user, bgr)
+        return MV_OK
+
+    def _stop(self, device):
+        device.grabbing = False
+        if device.thread is not None and device.thread is not threading.current_thread():
+            device.thread.join()
+        device.thread = None
+
+    def _next_frame(self, device, timeout_ms, bgr):
+        """按帧率等待下一帧到达，超时返回None；返回的数组为新分配的缓存"""
+        if self.fps:
+            wait = device.next_due - time.monotonic()
+            if wait > timeout_ms / 1000:
+                time.sleep(timeout_ms / 1000)
+                return None
+            if wait > 0:
+                time.sleep(wait)
+            # 相机自由运行：消费端来晚时直接拿最近一帧，之后仍按固定间隔出图
+            device.next_due = max(device.next_due + 1.0 / self.fps, time.monotonic())
+
+        frame = self.frames(device.frame_num)
+        device.frame_num += 1
+        image = frame if bgr else FROM_BGR[device.pixel_format](frame)
+        return np.ascontiguousarray(image)
+
+    def _fill_info(self, info, device, image, pixel_type):
+        height, width = image.shape[:2]
+        info.nWidth = min(width, 0xFFFF)
+        info.nHeight = min(height, 0xFFFF)
+        info.nExtendWidth = width
+        info.nExtendHeight = height
+        info.enPixelType = pixel_type
+        info.nFrameNum = device.frame_num
+        info.nFrameLen = image.nbytes
+        info.nHostTimeStamp = int(time.time() * 1000)
+
+    def _copy_frame(self, handle, data, data_size, info_ref, timeout_ms, bgr):
+        device = self._device(handle)
+        if device is None:
+            return MV_E_HANDLE
+        if not device.grabbing:
+            return MV_E_CALLORDER
+
+        image = self._next_frame(device, timeout_ms, bgr)
+        if image is None:
+            return MV_E_NODATA
+        if image.nbytes > getattr(data_size, 'value', data_size):
+            return MV_E_NOENOUGH_BUF
+
+        memmove(data, image.ctypes.data, image.nbytes)
+        self._fill_info(info_ref._obj, device, image, PixelType_Gvsp_BGR8_Packed if bgr else device.pixel_format)
+        return MV_OK
+
+    def _callback_loop(self, device):
+        callback, user, bgr = device.callback
+        info = MV_FRAME_OUT_INFO_EX()
+        while device.grabbing:
+            image = self._next_frame(device, 100, bgr)
+            if image is None:
+                continue
+            self._fill_info(info, device, image, PixelType_Gvsp_BGR8_Packed if bgr else device.pixel_format)
+            callback(image.ctypes.data_as(POINTER(c_ubyte)), pointer(info), user)
+
+
+def install(**kwargs):
+    """用模拟SDK替换 MvCamCtrldll 的后端并返回模拟对象，参数见 MockMvCamCtrl"""
+    mock = MockMvCamCtrl(**kwargs)
+    MvCamCtrldll.load(mock)
+    return mock
@@ -1,21 +1,27 @@
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QPushButton, QFrame, QComboBox)
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QImage, QPixmap
+import argparse
 import cv2
 import sys
 from game_logic import GameLogic, GameState
 from hand_recognition import HandRecognition
+import overlay
+from gesture_tracker import GestureTracker
+from frame_sources import create_source
+from recognition_worker import RecognitionWorker
 import time
 
 
 class GameWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, source='webcam:0', source_fps=0, render_policy='full'):
         super().__init__()
         self.setWindowTitle("石头剪刀布游戏")
 
         # 初始化手势识别模块
         self.hand_recognition = HandRecognition()
+        self.hand_recognition.render_policy = render_policy
 
         # 初始化游戏逻辑
         self.game_logic = GameLogic()
@@ -32,6 +38,15 @@ class GameWindow(QMainWindow):
         self.current_gesture = None  # 当前识别到的手势
         self.round_confirmed = False  # 是否确认本���结果
 
+        # 对逐帧识别结果做时间平滑，手势足够稳定时提前结束回合
+        self.gesture_tracker = GestureTracker()
+        self.early_commit = True
+
+        # 摄像头画面显示缓存：上次显示的帧序号和缩放目标尺寸
+        self._displayed_frame_id = None
+        self._display_geometry = None
+        self._overlay = []  # 最近一次识别结果的叠加层，识别间隙的画面沿用
+
         # 加载手势图片
         self.gesture_images = self._load_gesture_images()
 
@@ -40,11 +55,14 @@ class GameWindow(QMainWindow):
 
         # 初始化UI
         self._init_ui()
-        # 初始化摄像头
-        self.camera = cv2.VideoCapture(0)
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_frame)
-        self.timer.start(30)  # 30ms刷新率
+        # 初始化帧源（摄像头、海康相机、视频文件等），在独立线程中采集，识别端只取最新帧
+        self.source = create_source(source, fps=source_fps).open().start()
+
+        # 手势识别在后台线程中执行，结果通过信号回到界面线程
+        self.recognition_worker = RecognitionWorker(self.source, self.hand_recognition)
+        self.recognition_worker.result_ready.connect(self.process_frame)
+        self.recognition_worker.frame_ready.connect(self.show_frame)
+        self.recognition_worker.start()
 
     def _init_ui(self):
         """初始化UI界面"""
@@ -212,18 +230,19 @@ class GameWindow(QMainWindow):
         except Exception as e:
             print(f"Error in _create_control_buttons: {e}")
 
-    def process_frame(self):
-        """处理摄像头帧"""
+    def process_frame(self, frame_id, frame, gestures, primitives, features, timings):
+        """处理识别线程送回的结果"""
         try:
-            ret, frame = self.camera.read()
-            if not ret:
-                return
-
-            # 手势识别
-            frame, gestures = self.hand_recognition.detect_gestures(frame)
+            # 游戏进行中且不在暂停状态时，每帧结果（包括未检测到手部）都计入平滑
+            state = None
+            if self.is_playing and not self.round_confirmed and not self.round_paused:
+                if features is not None:
+                    state = self.gesture_tracker.update(gestures[0], features.defect_count)
+                else:
+                    state = self.gesture_tracker.update(None)
 
             # 游戏进行中且检测到手势且不在暂停状态
-            if self.is_playing and gestures and not self.round_confirmed and not self.round_paused:
+            if state is not None and gestures:
                 current_time = time.time()
                 elapsed_time = current_time - self.last_gesture_time
 
@@ -231,35 +250,70 @@ class GameWindow(QMainWindow):
                 remaining_time = max(0, self.gesture_timeout - elapsed_time)
                 self.time_label.setText(f"剩余时间: {remaining_time:.1f}s")
 
-                # 检查是否超时
-                if elapsed_time > self.gesture_timeout:
+                # 当前手势取平滑后的稳定手势，尚未稳定时取本帧结果
+                self.current_gesture = state.label or gestures[0]
+
+                # 检查是否超时，或手势已稳定到可以提前判定
+                if elapsed_time > self.gesture_timeout or (self.early_commit and state.committed):
                     self.round_paused = True  # 暂停回合
-                    self.current_gesture = gestures[0]
+                    self._update_player_display(self.current_gesture)
                     self._judge_round()  # 判定本回合结果
                     return
 
                 # 更新当前手势
-                self.current_gesture = gestures[0]
                 self._update_player_display(self.current_gesture)
 
             # 更新摄像头画面
-            self.update_camera_display(frame)
+            self._overlay = primitives
+            self.update_camera_display(frame, frame_id, primitives)
 
         except Exception as e:
             print(f"Error in process_frame: {e}")
+        finally:
+            self._update_schedule()
 
-    def update_camera_display(self, frame):
-        """更新摄像头画面显示"""
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        self.camera_label.setPixmap(pixmap.scaled(
-            self.camera_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        ))
+    def show_frame(self, frame_id, frame):
+        """显示识别线程跳过识别的帧，画面按采集帧率刷新"""
+        try:
+            self.update_camera_display(frame, frame_id, self._overlay)
+        except Exception as e:
+            print(f"Error in show_frame: {e}")
+
+    def _update_schedule(self):
+        """回合进行中全速识别，其余时间降低识别频率"""
+        self.recognition_worker.scheduler.set_active(self.is_playing and not self.round_paused)
+
+    def update_camera_display(self, frame, frame_id=None, primitives=()):
+        """更新摄像头画面显示，叠加层绘制在缩放后的显示副本上"""
+        # 没有新帧时不重绘
+        if frame_id is not None and frame_id == self._displayed_frame_id:
+            return
+        self._displayed_frame_id = frame_id
+
+        # 在OpenCV中一次缩放到标签尺寸（保持宽高比），直接以BGR格式交给QImage
+        target_w, target_h = self._display_size(frame.shape)
+        if (target_w, target_h) != (frame.shape[1], frame.shape[0]):
+            scale = target_w / frame.shape[1]
+            frame = cv2.resize(frame, (target_w, target_h), interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+            if primitives:
+                frame = frame.copy()  # 不修改采集线程交出的原始帧
+        overlay.render(frame, primitives, scale)
+
+        qt_image = QImage(frame.data, target_w, target_h, frame.strides[0], QImage.Format.Format_BGR888)
+        self.camera_label.setPixmap(QPixmap.fromImage(qt_image))
+
+    def _display_size(self, frame_shape):
+        """计算保持宽高比的显示尺寸，帧尺寸和标签尺寸不变时复用缓存"""
+        label_size = self.camera_label.size()
+        key = (frame_shape[1], frame_shape[0], label_size.width(), label_size.height())
+        if self._display_geometry is None or self._display_geometry[0] != key:
+            frame_w, frame_h, label_w, label_h = key
+            scale = min(label_w / frame_w, label_h / frame_h)
+            size = (max(1, int(frame_w * scale)), max(1, int(frame_h * scale)))
+            self._display_geometry = (key, size)
+        return self._display_geometry[1]
 
     def _update_player_display(self, gesture):
         """更新玩家手势显示"""
@@ -315,6 +369,7 @@ class GameWindow(QMainWindow):
                 self.round_paused = False
                 self.round_confirmed = False
                 self.current_gesture = None
+                self.gesture_tracker.reset()
                 self.last_gesture_time = time.time()
                 self.result_label.setText("平局！请重新出手")
                 self.time_label.setText(f"剩余时间: {self.gesture_timeout:.1f}s")
@@ -344,7 +399,9 @@ class GameWindow(QMainWindow):
             self.round_paused = False
             self.round_confirmed = False
             self.current_gesture = None
+            self.gesture_tracker.reset()
             self.last_gesture_time = time.time()
+            self._update_schedule()
 
             if not self.game_logic.game_state.is_game_over():
                 self.result_label.setText("新回合开始！")
@@ -410,8 +467,10 @@ class GameWindow(QMainWindow):
         self.round_paused = False
         self.round_confirmed = False
         self.current_gesture = None
+        self.gesture_tracker.reset()
         self.last_gesture_time = time.time()
         self.game_logic.game_state = GameState(best_of=self.rounds_setting)
+        self._update_schedule()
         self.score_label.setText("比分: 0 - 0")
         self.result_label.setText("游戏开始！")
         self.player_gesture_label.setText("等待出手...")
@@ -426,7 +485,8 @@ class GameWindow(QMainWindow):
 
     def closeEvent(self, event):
         """关闭窗口时释放摄像头"""
-        self.camera.release()
+        self.recognition_worker.stop()
+        self.source.close()
         event.accept()
 
     def _load_gesture_images(self):
@@ -444,7 +504,17 @@ class GameWindow(QMainWindow):
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = GameWindow()
+    parser = argparse.ArgumentParser(description="石头剪刀布游戏")
+    parser.add_argument('--source', default='webcam:0',
+                        help="帧源：webcam[:索引]、hik[:索引]、hik-callback[:索引]、hik-native[:索引]、"
+                             "hik-native-callback[:索引]、hik-mock、video:路径、images:目录、synthetic[:宽x高]")
+    parser.add_argument('--source-fps', type=float, default=30,
+                        help="视频、图片和合成帧源的播放帧率，0为全速")
+    parser.add_argument('--render', choices=('off', 'minimal', 'full'), default='full',
+                        help="画面叠加信息：off 不绘制，minimal 只显示外接框和手势，full 显示调试信息")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = GameWindow(args.source, args.source_fps, args.render)
     window.show()
     sys.exit(app.exec())
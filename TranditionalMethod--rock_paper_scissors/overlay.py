@@ -0,0 +1,48 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+# 叠加层图元，坐标均为原帧坐标
+# kind 为 'contour'（points 为点集）、'circle'（points 为圆心，size 为半径）、
+# 'rect'（points 为 (x, y, w, h)）或 'text'（points 为左下角，size 为字号）
+Primitive = namedtuple('Primitive', ['kind', 'points', 'color', 'thickness', 'size', 'text'])
+
+
+def contour(points, color, thickness=2):
+    return Primitive('contour', points, color, thickness, 0, None)
+
+
+def circle(center, radius, color, thickness=-1):
+    return Primitive('circle', center, color, thickness, radius, None)
+
+
+def rect(bbox, color, thickness=2):
+    return Primitive('rect', bbox, color, thickness, 0, None)
+
+
+def text(origin, content, color, font_scale=0.7, thickness=2):
+    return Primitive('text', origin, color, thickness, font_scale, content)
+
+
+def render(image, primitives, scale=1.0):
+    """把图元绘制到 image 上（原地修改），scale 为 image 相对原帧的缩放比例"""
+    for item in primitives:
+        thickness = item.thickness if item.thickness < 0 else max(1, round(item.thickness * scale))
+        if item.kind == 'contour':
+            points = item.points if scale == 1.0 else np.round(item.points * scale).astype(np.int32)
+            cv2.drawContours(image, [points], -1, item.color, thickness)
+        elif item.kind == 'circle':
+            cv2.circle(image, _scaled(item.points, scale), max(1, round(item.size * scale)), item.color, thickness)
+        elif item.kind == 'rect':
+            x, y, w, h = item.points
+            cv2.rectangle(image, _scaled((x, y), scale), _scaled((x + w, y + h), scale), item.color, thickness)
+        elif item.kind == 'text':
+            cv2.putText(image, item.text, _scaled(item.points, scale),
+                        cv2.FONT_HERSHEY_SIMPLEX, item.size * scale, item.color, thickness)
+    return image
+
+
+def _scaled(point, scale):
+    return (round(point[0] * scale), round(point[1] * scale))
@@ -0,0 +1,177 @@
+import multiprocessing as mp
+import queue
+from collections import deque, namedtuple
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from hand_recognition import HandRecognition
+
+
+# 工作进程返回的紧凑结果，不包含图像；识别出错时 error 为错误信息，其余字段同未检测到手部
+GestureResult = namedtuple('GestureResult', ['seq', 'gesture', 'defect_count', 'area', 'solidity',
+                                             'bbox', 'center', 'hull_area', 'extent', 'error'],
+                           defaults=(None,))
+
+
+def _compact_result(seq, gesture, features):
+    """把特征记录压缩为可廉价跨进程传输的结果"""
+    if features is None:
+        return GestureResult(seq, None, 0, 0.0, 0.0, None, None, 0.0, 0.0)
+    return GestureResult(seq, gesture, features.defect_count, float(features.area),
+                         float(features.solidity), tuple(features.bbox),
+                         tuple(int(v) for v in features.center),
+                         float(features.hull_area), float(features.extent))
+
+
+def result_row(result):
+    """把结果转换为 hand_features.FEATURE_DTYPE 的一行，未检测到手部时返回None"""
+    if result.bbox is None:
+        return None
+    return (True, result.area, result.hull_area, result.solidity, result.extent, result.bbox, result.center,
+            result.defect_count)
+
+
+def _worker_main(shm_name, slots, frame_shape, tasks, results, settings=None):
+    """工作进程：从共享内存槽位读取帧并识别，只回传紧凑结果"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf)
+
+    # 并行度由进程数提供，OpenCV 内部不再开线程，避免各进程互相争抢CPU
+    cv2.setNumThreads(1)
+
+    # 相邻帧会分到不同进程，跟踪和运动门控状态没有意义
+    hand_recognition = HandRecognition()
+    if settings:
+        hand_recognition.apply_settings(settings)
+    hand_recognition.tracking_params['enabled'] = False
+    hand_recognition.motion_params['enabled'] = False
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot = task
+            try:
+                gesture, features = hand_recognition.analyze_frame(ring[slot])
+                result = _compact_result(seq, gesture, features)
+            except Exception as e:
+                # 单帧出错时仍回传结果，归还槽位并保持序号连续
+                result = GestureResult(seq, None, 0, 0.0, 0.0, None, None, 0.0, 0.0, str(e))
+            results.put((slot, result))
+    finally:
+        del ring
+        shm.close()
+
+
+class ProcessPoolRecognizer:
+    """多进程手势识别：帧写入共享内存环形槽位，工作进程按槽位识别，结果按提交顺序返回"""
+
+    def __init__(self, frame_shape, workers=None, slots=None, settings=None):
+        self.frame_shape = tuple(frame_shape)
+        self.workers = workers or mp.cpu_count()
+        self.slots = slots or 2 * self.workers  # 每个进程一帧在处理、一帧在排队
+
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self._ring = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+
+        self._tasks = mp.Queue()
+        self._results = mp.Queue()
+        self._free_slots = deque(range(self.slots))
+        self._finished = {}  # 已完成但尚未按序返回的结果
+        self._next_seq = 0
+        self._next_result = 0
+
+        self._processes = [
+            mp.Process(target=_worker_main, daemon=True,
+                       args=(self._shm.name, self.slots, self.frame_shape, self._tasks, self._results, settings))
+            for _ in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def pending(self):
+        """已提交但尚未取回的帧数"""
+        return self._next_seq - self._next_result
+
+    def submit(self, frame):
+        """把帧复制进空闲槽位并派发，返回序号；没有空闲槽位时阻塞等待（背压）"""
+        if frame.shape != self.frame_shape or frame.dtype != np.uint8:
+            raise ValueError(f"expected uint8 frame of shape {self.frame_shape}, got {frame.dtype} {frame.shape}")
+
+        while not self._free_slots:
+            self._collect(block=True)
+
+        slot = self._free_slots.popleft()
+        np.copyto(self._ring[slot], frame)
+        seq = self._next_seq
+        self._next_seq += 1
+        self._tasks.put((seq, slot))
+        return seq
+
+    def get(self):
+        """按提交顺序取回下一个结果，必要时阻塞"""
+        if not self.pending:
+            raise RuntimeError("no frames pending")
+        while self._next_result not in self._finished:
+            self._collect(block=True)
+        self._next_result += 1
+        return self._finished.pop(self._next_result - 1)
+
+    def imap(self, frames):
+        """流式处理帧序列，按输入顺序逐个产出结果"""
+        for frame in frames:
+            self.submit(frame)
+            # 顺便取走已就绪的结果，避免无谓地占用槽位
+            while self.pending and self._ready():
+                yield self.get()
+        while self.pending:
+            yield self.get()
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        if self._shm is None:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        del self._ring
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def _ready(self):
+        """下一个按序结果是否已就绪（非阻塞地收取已完成的结果）"""
+        while self._collect(block=False):
+            pass
+        return self._next_result in self._finished
+
+    def _collect(self, block):
+        """收取一个完成的结果并归还其槽位，返回是否收到；阻塞等待期间工作进程退出时抛出 RuntimeError"""
+        while True:
+            try:
+                slot, result = self._results.get(block=block, timeout=0.5 if block else None)
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                dead = [process.pid for process in self._processes if not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f"recognition worker process exited unexpectedly (pid {dead})")
+        self._free_slots.append(slot)
+        self._finished[result.seq] = result
+        return True
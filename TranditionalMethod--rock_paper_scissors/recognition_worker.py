@@ -0,0 +1,111 @@
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from skin_model import native_to_bgr
+
+
+class AdaptiveScheduler:
+    """根据游戏状态和实测识别耗时决定两次识别之间的最短间隔
+
+    识别占用的CPU时间比例（识别耗时/间隔）不超过所处状态的占空比：活跃回合默认0.8，
+    识别快于帧率时每帧都处理，识别变慢时拉长间隔，给采集和界面留出余量；
+    空闲时占空比更低，且处理频率不高于 idle_fps。
+    """
+
+    def __init__(self, active_duty=0.8, idle_duty=0.2, idle_fps=5, smoothing=0.2):
+        self.active_duty = active_duty  # 活跃回合的识别占空比
+        self.idle_duty = idle_duty  # 空闲时的识别占空比
+        self.idle_fps = idle_fps  # 空闲时的最高处理频率
+        self.smoothing = smoothing  # 识别耗时指数平均的权重
+        self.active = False
+        self.cost = 0.0  # 平滑后的识别耗时（秒）
+
+    def set_active(self, active):
+        """切换活跃/空闲状态"""
+        self.active = active
+
+    def record(self, cost):
+        """记录一次识别耗时"""
+        self.cost += self.smoothing * (cost - self.cost)
+
+    def interval(self):
+        """当前状态下两次识别之间的最短间隔（秒）"""
+        if self.active:
+            return self.cost / self.active_duty
+        return max(self.cost / self.idle_duty, 1.0 / self.idle_fps)
+
+    def due(self, last_start):
+        """距上次识别开始是否已过最短间隔"""
+        return time.monotonic() - last_start >= self.interval()
+
+
+class RecognitionWorker(QThread):
+    """在后台线程中执行手势识别，通过排队信号把结果送回界面线程
+
+    每一帧新画面都会送出：到了识别时间的帧识别后经 result_ready 送出，其余帧经 frame_ready 直接送出，
+    调度器只限制识别频率，不影响画面刷新。原始格式的帧（CapturedFrame.pixel_format 非None）
+    直接交给 analyze_native 识别，只为显示转换为BGR，送出的图像总是BGR。
+    """
+
+    # 帧序号、原始图像、手势列表、叠加层图元、手部特征（HandFeatures，未检测到手部时为None）、耗时信息
+    result_ready = pyqtSignal(int, object, object, object, object, object)
+    # 未识别的帧：帧序号、原始图像
+    frame_ready = pyqtSignal(int, object)
+
+    def __init__(self, capture, hand_recognition, scheduler=None, parent=None):
+        super().__init__(parent)
+        self.capture = capture
+        self.hand_recognition = hand_recognition
+        self.scheduler = scheduler if scheduler is not None else AdaptiveScheduler()
+
+    def run(self):
+        last_start = 0.0
+        while not self.isInterruptionRequested():
+            # 分段等待以便及时响应停止请求
+            captured = self.capture.latest(timeout=0.1)
+            if captured is None:
+                continue
+
+            if not self.scheduler.due(last_start):
+                self.frame_ready.emit(captured.frame_id, self._display_frame(captured))
+                continue
+
+            start = time.monotonic()
+            try:
+                if captured.pixel_format is None:
+                    gesture, features = self.hand_recognition.analyze_frame(captured.frame)
+                else:
+                    gesture, features = self.hand_recognition.analyze_native(captured.frame, captured.pixel_format)
+                primitives = self.hand_recognition.build_overlay(features, gesture)
+            except Exception as e:
+                # 个别帧识别失败（如自相交轮廓）时跳过该帧，不让异常终止线程
+                print(f"Error in recognition worker: {e}")
+                last_start = start
+                self.frame_ready.emit(captured.frame_id, self._display_frame(captured))
+                continue
+            done = time.monotonic()
+            last_start = start
+            self.scheduler.record(done - start)
+
+            timings = {
+                'captured_at': captured.timestamp,
+                'recognition': done - start,  # 识别耗时（秒）
+                'latency': done - captured.timestamp,  # 采集到识别完成的延迟（秒）
+                'interval': self.scheduler.interval(),  # 当前调度间隔（秒）
+            }
+            gestures = [gesture] if features is not None else []
+            self.result_ready.emit(captured.frame_id, self._display_frame(captured), gestures, primitives, features,
+                                   timings)
+
+    @staticmethod
+    def _display_frame(captured):
+        """供界面显示的BGR图像"""
+        if captured.pixel_format is None:
+            return captured.frame
+        return native_to_bgr(captured.frame, captured.pixel_format)
+
+    def stop(self):
+        """请求停止并等待线程退出"""
+        self.requestInterruption()
+        self.wait()
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+
+# 支持的颜色空间及其转换码
+COLOR_SPACE_CODES = {
+    'YCrCb': cv2.COLOR_BGR2YCrCb,
+    'HSV': cv2.COLOR_BGR2HSV,
+}
+
+# 相机原始Bayer格式的去马赛克转换码
+BAYER_CODES = {
+    'BayerRG': cv2.COLOR_BayerRGGB2BGR,
+    'BayerGR': cv2.COLOR_BayerGRBG2BGR,
+    'BayerGB': cv2.COLOR_BayerGBRG2BGR,
+    'BayerBG': cv2.COLOR_BayerBGGR2BGR,
+}
+
+# 打包YUV422格式转换为BGR的转换码（只用于显示）
+YUV422_BGR_CODES = {
+    'YUYV': cv2.COLOR_YUV2BGR_YUYV,
+    'UYVY': cv2.COLOR_YUV2BGR_UYVY,
+}
+
+# 打包YUV422格式每两个像素 4 字节到展开后 (Y0 U V Y1 U V) 6 字节的 mixChannels 映射
+YUV422_LAYOUTS = {
+    'YUYV': [0, 0, 1, 1, 3, 2, 2, 3, 1, 4, 3, 5],  # Y0 U Y1 V
+    'UYVY': [1, 0, 0, 1, 2, 2, 3, 3, 0, 4, 2, 5],  # U Y0 V Y1
+}
+
+# 已编译查找表的进程内缓存，多个识别实例共享
+_TABLE_CACHE = {}
+
+
+def default_cache_dir():
+    """查找表的默认磁盘缓存目录"""
+    return os.path.join(os.path.expanduser('~'), '.cache', 'rock_paper_scissors')
+
+
+def reference_skin_mask(frame, skin_ranges):
+    """按 skin_ranges 逐颜色空间计算肤色掩码（原始实现，用于编译查找表）"""
+    final_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+
+    for color_space_info in skin_ranges:
+        converted = cv2.cvtColor(frame, COLOR_SPACE_CODES[color_space_info['color_space']])
+
+        for lower, upper in color_space_info['ranges']:
+            mask = cv2.inRange(converted, np.array(lower), np.array(upper))
+            cv2.bitwise_or(final_mask, mask, dst=final_mask)
+
+    return final_mask
+
+
+def native_to_planar(image, pixel_format, dst=None):
+    """把相机原始格式展开为三通道图像，返回 (图像, 颜色空间)
+
+    YUV422 只把色度重复到每个像素得到 YUV 4:4:4，不经过BGR；
+    Bayer 没有颜色信息无法绕开去马赛克，直接解到 dst 中。
+    """
+    height, width = image.shape[:2]
+    if dst is None:
+        dst = np.empty((height, width, 3), dtype=np.uint8)
+
+    if pixel_format in BAYER_CODES:
+        cv2.cvtColor(image, BAYER_CODES[pixel_format], dst=dst)
+        return dst, 'BGR'
+
+    if pixel_format not in YUV422_LAYOUTS:
+        raise ValueError(f"unsupported native pixel format {pixel_format!r}")
+    if width % 2:
+        raise ValueError(f"YUV422 frame width must be even, got {width}")
+
+    # 以两个像素为一组一次完成重排，dst 须为连续数组，reshape 才是视图
+    pairs = image.reshape(height, width // 2, 4)
+    cv2.mixChannels([pairs], [dst.reshape(height, width // 2, 6)], YUV422_LAYOUTS[pixel_format])
+    return dst, 'YUV'
+
+
+def native_to_bgr(image, pixel_format):
+    """把相机原始格式转换为新分配的BGR图像，用于显示"""
+    code = BAYER_CODES.get(pixel_format, YUV422_BGR_CODES.get(pixel_format))
+    if code is None:
+        raise ValueError(f"unsupported native pixel format {pixel_format!r}")
+    return cv2.cvtColor(image, code)
+
+
+def planar_yuv_to_bgr(yuv):
+    """把 YUV 4:4:4 颜色转换为BGR，与 OpenCV 解码 YUYV 的结果一致（只用于编译查找表）"""
+    pixels = yuv.reshape(-1, 1, 3)
+    packed = np.empty((pixels.shape[0], 2, 2), dtype=np.uint8)
+    packed[:, :, 0] = pixels[:, :, 0]
+    packed[:, 0, 1] = pixels[:, 0, 1]
+    packed[:, 1, 1] = pixels[:, 0, 2]
+    bgr = cv2.cvtColor(packed, cv2.COLOR_YUV2BGR_YUYV)[:, :1]
+    return bgr.reshape(yuv.shape)
+
+
+class SkinClassifier:
+    """不量化的肤色分类器：逐颜色空间转换后比较范围，结果与 reference_skin_mask 一致
+
+    接口与 SkinLUT 相同，只接受BGR输入；阈值数组在构造时准备好，转换结果写入调用方提供的缓冲区，
+    合并各范围用的临时掩码复用分类器自己的缓冲区（只在帧尺寸超过已分配容量时重新分配）。
+    """
+
+    def __init__(self, skin_ranges):
+        self.input_space = 'BGR'
+        self.key = SkinLUT.config_key(skin_ranges, None)
+        self._stages = [
+            (COLOR_SPACE_CODES[info['color_space']],
+             [(np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8)) for lower, upper in info['ranges']])
+            for info in skin_ranges
+        ]
+        self._mask = np.empty((0, 0), dtype=np.uint8)
+
+    def classify(self, frame, dst=None, quantized=None, index=None):
+        """对BGR图像计算肤色掩码，quantized 可传入与 frame 同形状的缓冲区存放颜色空间转换结果"""
+        height, width = frame.shape[:2]
+        if dst is None:
+            dst = np.empty((height, width), dtype=np.uint8)
+        if height > self._mask.shape[0] or width > self._mask.shape[1]:
+            self._mask = np.empty((max(height, self._mask.shape[0]), max(width, self._mask.shape[1])), dtype=np.uint8)
+        mask = self._mask[:height, :width]
+
+        # 第一个范围直接写入 dst，之后的范围并入
+        first = True
+        for code, ranges in self._stages:
+            converted = cv2.cvtColor(frame, code, dst=quantized)
+            for lower, upper in ranges:
+                if first:
+                    cv2.inRange(converted, lower, upper, dst=dst)
+                    first = False
+                else:
+                    cv2.inRange(converted, lower, upper, dst=mask)
+                    cv2.bitwise_or(dst, mask, dst=dst)
+        if first:
+            dst.fill(0)
+        return dst
+
+
+# 查找表支持的输入颜色空间及编译时转换为BGR的函数
+INPUT_SPACES = {
+    'BGR': None,
+    'YUV': planar_yuv_to_bgr,
+}
+
+
+class SkinLUT:
+    """将 skin_ranges 编译为量化的 颜色→掩码 查找表，每帧只需一次查表
+
+    input_space 为 'BGR' 时输入为BGR图像，为 'YUV' 时输入为 native_to_planar 展开的 YUV 4:4:4 图像。
+    """
+
+    def __init__(self, skin_ranges, bits=6, cache_dir=None, input_space='BGR'):
+        if not 1 <= bits <= 8:
+            raise ValueError(f"bits must be in [1, 8], got {bits}")
+        if input_space not in INPUT_SPACES:
+            raise ValueError(f"input_space must be one of {list(INPUT_SPACES)}, got {input_space!r}")
+
+        self.bits = bits
+        self.shift = 8 - bits
+        self.input_space = input_space
+        self.key = self.config_key(skin_ranges, bits, input_space)
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.table = self._load_or_compile(skin_ranges)
+
+    @staticmethod
+    def config_key(skin_ranges, bits, input_space='BGR'):
+        """由肤色范围配置、量化位数和输入颜色空间生成缓存键"""
+        payload = json.dumps([skin_ranges, bits, input_space], sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    def classify(self, frame, dst=None, quantized=None, index=None):
+        """对 input_space 颜色空间的图像查表得到肤色掩码，可传入预分配的输出和中间缓冲区"""
+        bits = self.bits
+        if self.shift:
+            quantized = np.right_shift(frame, self.shift, out=quantized)
+        else:
+            quantized = frame
+
+        # 索引布局为 (通道2, 通道1, 通道0)，BGR输入即 (R, G, B)，与编译时一致
+        if index is None:
+            index = np.empty(frame.shape[:2], dtype=np.uint32)
+        np.copyto(index, quantized[..., 2])
+        index <<= bits
+        index |= quantized[..., 1]
+        index <<= bits
+        index |= quantized[..., 0]
+
+        return self.table.take(index, out=dst, mode='clip')
+
+    def _load_or_compile(self, skin_ranges):
+        """依次尝试进程内缓存、磁盘缓存，最后重新编译"""
+        table = _TABLE_CACHE.get(self.key)
+        if table is not None:
+            return table
+
+        path = os.path.join(self.cache_dir, f"skin_lut_{self.key}.npy")
+        size = 1 << (3 * self.bits)
+        try:
+            table = np.load(path)
+            if table.dtype != np.uint8 or table.shape != (size,):
+                table = None
+        except (OSError, ValueError):
+            table = None
+
+        if table is None:
+            table = self._compile(skin_ranges)
+            self._save(path, table)
+
+        _TABLE_CACHE[self.key] = table
+        return table
+
+    def _compile(self, skin_ranges):
+        """用每个量化格子的中心颜色跑一遍原始分类器"""
+        bits = self.bits
+        levels = 1 << bits
+        centers = (np.arange(levels, dtype=np.uint16) << self.shift) + ((1 << self.shift) >> 1)
+        centers = centers.astype(np.uint8)
+
+        # 每一行固定 (通道2, 通道1)，列方向遍历通道0
+        grid = np.empty((levels * levels, levels, 3), dtype=np.uint8)
+        grid[..., 0] = centers[np.newaxis, :]
+        grid[..., 1] = np.tile(centers, levels)[:, np.newaxis]
+        grid[..., 2] = np.repeat(centers, levels)[:, np.newaxis]
+
+        to_bgr = INPUT_SPACES[self.input_space]
+        if to_bgr is not None:
+            grid = to_bgr(grid)
+        return reference_skin_mask(grid, skin_ranges).reshape(-1)
+
+    def _save(self, path, table):
+        """原子地写入磁盘缓存，失败时只放弃缓存"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, table)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error saving skin LUT cache: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass